@@ -0,0 +1,2 @@
+# Transposable element dilution simulation. Run it with python -m te_dilution;
+# the engines, layouts and result writers are the modules of this package.
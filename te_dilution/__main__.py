@@ -0,0 +1,5 @@
+# Packages:
+import sys
+from .cli import main
+
+sys.exit(main())
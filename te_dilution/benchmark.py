@@ -0,0 +1,160 @@
+# Packages:
+import argparse
+import json
+import platform
+import sys
+import time
+import numpy as np
+from . import kernels, simulation
+from .coarsening import coarsen_grid
+from .genome_composition import GenomeConfig, scaled_genome_parameters
+
+
+# Repeatable benchmarks of the simulation hot paths at genome sizes from 10 kb
+# to the full 180 Mb fly genome. `run` times every benchmark at every size and
+# writes a JSON baseline; `compare` lines two baselines up, prints the ratio
+# per (benchmark, size) and the log-log scaling slope per benchmark, and exits
+# non-zero if anything got slower than the tolerance allows.
+#
+#   python -m te_dilution.benchmark run --output baseline.json
+#   python -m te_dilution.benchmark run --sizes 10000 1000000 --output after.json
+#   python -m te_dilution.benchmark compare baseline.json after.json
+default_sizes = [10000, 100000, 1000000, 18000000, 180000000]
+benchmark_seed = 0
+
+
+def best_time(function, repeats, setup=None):
+    """ Best wall time of function(*setup()) over repeats runs; setup is not timed. """
+    # One untimed call first, so Numba compilation and cold caches don't land in the first size's time
+    function(*(setup() if setup is not None else ()))
+    times = []
+    for _ in range(repeats):
+        arguments = setup() if setup is not None else ()
+        started = time.perf_counter()
+        function(*arguments)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def benchmark_size(genome_size, repeats, dtype):
+    lengths = GenomeConfig(scaled_genome_parameters(genome_size), seed=benchmark_seed).element_lengths
+    rng = np.random.default_rng(benchmark_seed)
+
+    def empty_grid():
+        return (simulation.initialize_grid(2, genome_size, dtype), lengths, None, rng)
+
+    def populated_grid():
+        grid = simulation.initialize_grid(2, genome_size, dtype)
+        element_table = simulation.populate_grid(grid, lengths, rng=rng)
+        return (grid, 2, simulation.initialize_interaction_log(1), 0, element_table, rng)
+
+    # 10,000 neighbour checks at random positions, the per-move cost inside move_element_optimized
+    def interaction_checks():
+        grid = simulation.initialize_grid(2, genome_size, dtype)
+        simulation.populate_grid(grid, lengths, rng=rng)
+        return (grid, rng.integers(0, 2, 10000), rng.integers(0, genome_size, 10000), simulation.initialize_interaction_log(1))
+
+    def check_interactions(grid, strands, starts, interaction_log):
+        for strand, start in zip(strands.tolist(), starts.tolist()):
+            simulation.check_and_record_interactions(grid, strand, start, 1000, 2, interaction_log, 0)
+
+    # 100 end-of-genome growths of 1 kb each, as a burst of moves past the end would cause
+    def grow_repeatedly(grid):
+        for _ in range(100):
+            grid = simulation.resize_grid(grid, 1000)
+
+    # Half-scale copy of a populated grid, the step the scaled-down prototype profiled
+    def populated_grid_for_coarsening():
+        grid = simulation.initialize_grid(2, genome_size, dtype)
+        element_table = simulation.populate_grid(grid, lengths, rng=rng)
+        return (grid, 2, element_table)
+
+    def full_run():
+        simulation.single_simulation_run(0, dtype=dtype, seed=benchmark_seed, element_types=lengths, width=genome_size, rounds=1)
+
+    return {
+        'populate_grid': best_time(simulation.populate_grid, repeats, empty_grid),
+        'move_element_optimized': best_time(simulation.move_element_optimized, repeats, populated_grid),
+        'check_and_record_interactions': best_time(check_interactions, repeats, interaction_checks),
+        'coarsen_grid': best_time(coarsen_grid, repeats, populated_grid_for_coarsening),
+        'resize_grid': best_time(grow_repeatedly, repeats, lambda: (simulation.initialize_grid(2, genome_size, dtype),)),
+        'single_simulation_run': best_time(full_run, repeats),
+    }
+
+
+def run_benchmarks(sizes, repeats, dtype, output_path):
+    results = {}
+    for genome_size in sizes:
+        for name, seconds in benchmark_size(genome_size, repeats, dtype).items():
+            results.setdefault(name, {})[str(genome_size)] = seconds
+            print(f"{name:32s} {genome_size:>12,d} bp  {seconds:10.4f} s")
+    baseline = {
+        'metadata': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.platform(),
+            'dtype': np.dtype(dtype).name,
+            'backend': kernels.active_backend(),
+            'repeats': repeats,
+        },
+        'results': results
+    }
+    with open(output_path, 'w') as baseline_file:
+        json.dump(baseline, baseline_file, indent=2)
+    return baseline
+
+
+def scaling_slope(timings):
+    # Exponent b of time ~ size^b, fitted on log-log axes (1 = linear)
+    sizes = sorted(timings, key=int)
+    if len(sizes) < 2:
+        return float('nan')
+    return np.polyfit(np.log([int(size) for size in sizes]), np.log([max(timings[size], 1e-9) for size in sizes]), 1)[0]
+
+
+def compare_benchmarks(baseline_path, candidate_path, tolerance):
+    """ Print candidate/baseline time ratios and return the (benchmark, size) pairs slower than tolerance allows. """
+    with open(baseline_path) as baseline_file:
+        baseline = json.load(baseline_file)['results']
+    with open(candidate_path) as candidate_file:
+        candidate = json.load(candidate_file)['results']
+    regressions = []
+    for name in sorted(set(baseline) & set(candidate)):
+        shared = sorted(set(baseline[name]) & set(candidate[name]), key=int)
+        for size in shared:
+            ratio = candidate[name][size] / max(baseline[name][size], 1e-9)
+            flag = ''
+            if ratio > tolerance:
+                regressions.append((name, int(size)))
+                flag = '  REGRESSION'
+            print(f"{name:32s} {int(size):>12,d} bp  {baseline[name][size]:10.4f} s -> {candidate[name][size]:10.4f} s  x{ratio:.2f}{flag}")
+        old_slope = scaling_slope({size: baseline[name][size] for size in shared})
+        new_slope = scaling_slope({size: candidate[name][size] for size in shared})
+        print(f"{name:32s} scaling exponent {old_slope:.2f} -> {new_slope:.2f}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the simulation hot paths across genome sizes.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help="time every benchmark and save a JSON baseline")
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=default_sizes)
+    run_parser.add_argument('--repeats', type=int, default=3)
+    run_parser.add_argument('--dtype', default='uint8', help="grid dtype; uint8 keeps 180 Mb runs in memory")
+    run_parser.add_argument('--output', default='benchmark_baseline.json')
+    compare_parser = commands.add_parser('compare', help="compare a new baseline against an old one")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--tolerance', type=float, default=1.1, help="slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        run_benchmarks(args.sizes, args.repeats, np.dtype(args.dtype), args.output)
+        return 0
+    regressions = compare_benchmarks(args.baseline, args.candidate, args.tolerance)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
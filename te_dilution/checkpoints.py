@@ -0,0 +1,115 @@
+# Packages:
+import glob
+import json
+import logging
+import os
+import numpy as np
+from .genome_composition import element_names
+from .grid_storage import grow_grid
+from .interval_genome import IntervalGenome
+from .run_length import RunLengthGenome
+
+
+# Round-level checkpoints. After a round, the genome, the interaction log so far
+# and the RNG bit-generator state go into one compressed .npz, written under a
+# temporary name and renamed into place, so the file on disk is always the
+# latest complete checkpoint. Resuming restores all three and carries on from
+# the next round, drawing exactly the numbers an uninterrupted run would have.
+# The rope engine is rebuilt from the interval store every round, so for it
+# the interval store is the genome that gets saved. Each checkpoint also carries
+# the engine that wrote it and the run's root seed and element lengths, so
+# resuming needs neither --seed nor --genome-seed and can refuse settings that
+# don't match the saved run.
+def checkpoint_path(checkpoint_dir, simulation_number):
+    return os.path.join(checkpoint_dir, f"replicate_{simulation_number}.npz")
+
+
+def genome_arrays(genome):
+    if isinstance(genome, IntervalGenome):
+        return {
+            'width': genome.width,
+            'next_id': genome.next_id,
+            'strand_sizes': [len(starts) for starts in genome.starts],
+            'starts': np.concatenate(genome.starts),
+            'ends': np.concatenate(genome.ends),
+            'types': np.concatenate(genome.types),
+            'ids': np.concatenate(genome.ids)
+        }
+    # Dense grids are saved run-length encoded: a few hundred KB instead of the raw cells
+    return {'dtype': genome.dtype.str, **RunLengthGenome.from_grid(genome).to_arrays()}
+
+
+def restore_genome(genome, state):
+    """ Load the saved genome into genome (widening it if needed) and return it. """
+    if isinstance(genome, IntervalGenome):
+        genome.width = int(state['width'])
+        genome.next_id = int(state['next_id'])
+        bounds = np.cumsum(np.concatenate(([0], state['strand_sizes'])))
+        for strand in range(genome.num_strands):
+            piece = slice(bounds[strand], bounds[strand + 1])
+            genome.starts[strand] = state['starts'][piece].copy()
+            genome.ends[strand] = state['ends'][piece].copy()
+            genome.types[strand] = state['types'][piece].copy()
+            genome.ids[strand] = state['ids'][piece].copy()
+        return genome
+    saved = RunLengthGenome.from_arrays(state)
+    if saved.width > genome.shape[1]:
+        genome = grow_grid(genome, saved.width - genome.shape[1])
+    genome[:, :saved.width] = saved.to_grid(np.dtype(str(state['dtype'])))
+    return genome
+
+
+def save_checkpoint(path, next_round, seed, genome, interaction_log, rng, root_seed=None, element_lengths=None,
+                    composition_log=None, engine=None):
+    """ Atomically write the state needed to resume at next_round. """
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temporary_path = path + '.tmp.npz'
+    run_arrays = {}
+    if engine is not None:
+        run_arrays['engine'] = engine
+    if root_seed is not None:
+        # Root entropy can exceed 64 bits, so it is stored as a decimal string
+        run_arrays['root_seed'] = str(root_seed)
+    if element_lengths is not None:
+        run_arrays.update({name: element_lengths[code] for code, name in element_names.items()})
+    if composition_log is not None:
+        run_arrays['composition_log'] = composition_log
+    np.savez_compressed(temporary_path, next_round=next_round, seed=np.uint64(seed),
+                        interaction_log=interaction_log,
+                        rng_state=json.dumps(rng.bit_generator.state),
+                        **run_arrays, **genome_arrays(genome))
+    os.replace(temporary_path, path)
+    logging.info(f"Checkpoint after round {next_round - 1} written to {path}")
+
+
+def load_checkpoint(path):
+    """ Return the saved arrays as a dict, or None if there is no checkpoint yet. """
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as saved:
+        state = {name: saved[name] for name in saved.files}
+    state['next_round'] = int(state['next_round'])
+    state['seed'] = int(state['seed'])
+    state['rng_state'] = json.loads(str(state['rng_state']))
+    if 'engine' in state:
+        state['engine'] = str(state['engine'])
+    if 'root_seed' in state:
+        state['root_seed'] = int(str(state['root_seed']))
+    if all(name in state for name in element_names.values()):
+        state['element_lengths'] = {code: state.pop(name) for code, name in element_names.items()}
+    return state
+
+
+def saved_run(checkpoint_dir):
+    """ (root_seed, element_lengths) of the run checkpointed in checkpoint_dir, or None if it saved neither. """
+    for path in sorted(glob.glob(os.path.join(checkpoint_dir, 'replicate_*.npz'))):
+        if path.endswith('.tmp.npz'):
+            continue
+        with np.load(path) as saved:
+            if 'root_seed' in saved.files:
+                return int(str(saved['root_seed'])), {code: saved[name] for code, name in element_names.items()}
+    return None
+
+
+def same_lengths(element_lengths, other_lengths):
+    return all(np.array_equal(element_lengths[code], other_lengths[code]) for code in element_names)
@@ -0,0 +1,75 @@
+# Packages:
+import argparse
+import logging
+import os
+import numpy as np
+from . import simulation
+from .genome_composition import GenomeConfig, element_names, scaled_genome_parameters
+
+
+# Command line for the whole simulation: python -m te_dilution. Everything the
+# old per-experiment scripts hard-coded is an option here, and they all run the
+# one implementation in simulation.py. matplotlib is only imported for --report.
+#
+#   python -m te_dilution --replicates 100 --workers 8 --seed 1 --output results/
+#   python -m te_dilution --genome-size 1000000 --rounds 10 --engine interval --output results.csv
+#   python -m te_dilution --checkpoint-dir checkpoints --resume --output results/   (seed and genome come from the checkpoints)
+def build_parser():
+    parser = argparse.ArgumentParser(prog='python -m te_dilution',
+                                     description="Simulate transposable element movement through a genome.")
+    parser.add_argument('--genome-size', type=int, default=simulation.genome_size,
+                        help="genome width in bp; element counts and length caps scale with it")
+    parser.add_argument('--rounds', type=int, default=simulation.num_rounds)
+    parser.add_argument('--replicates', type=int, default=1)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--engine', choices=['dense', 'interval', 'rope'], default='dense')
+    parser.add_argument('--copy-and-paste', action='store_true',
+                        help="rope engine: retrotransposons copy and paste instead of cut and paste")
+    parser.add_argument('--layout', choices=['incremental', 'vectorized'], default='incremental')
+    parser.add_argument('--move-mode', choices=['sequential', 'batched'], default='sequential')
+    parser.add_argument('--dtype', default='int64', help="dense grid dtype, e.g. uint8")
+    parser.add_argument('--memmap-dir', default=None, help="back dense grids with files in this directory (deleted as each replicate finishes)")
+    parser.add_argument('--coarsen', type=int, default=1, help="run a 1/N scale prototype")
+    parser.add_argument('--seed', type=int, default=None, help="root seed for the replicate streams")
+    parser.add_argument('--genome-seed', type=int, default=None, help="pin the sampled element lengths")
+    parser.add_argument('--genome-cache', default=simulation.genome_cache_dir)
+    parser.add_argument('--output', default='simulation_results.csv',
+                        help=".csv, .parquet, or a directory of .npy shards")
+    parser.add_argument('--checkpoint-dir', default=None)
+    parser.add_argument('--checkpoint-every', type=int, default=1)
+    parser.add_argument('--resume', action='store_true', help="continue every replicate from its checkpoint")
+    parser.add_argument('--metrics', default=None, help="JSON lines of phase timings, counters and per-round composition per replicate")
+    parser.add_argument('--report', default=None, help="render the figures to this PDF after the run")
+    parser.add_argument('--backend', choices=['auto', 'numba', 'numpy'], default=None,
+                        help="compiled Numba kernels or the NumPy path (default: auto, or $TE_DILUTION_BACKEND)")
+    parser.add_argument('--log', default=None, help="write INFO logging to this file")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.log is not None:
+        logging.basicConfig(filename=args.log, filemode='w', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.resume and args.checkpoint_dir is None:
+        raise SystemExit("--resume needs --checkpoint-dir")
+    if args.copy_and_paste and args.engine != 'rope':
+        raise SystemExit("--copy-and-paste needs --engine rope")
+
+    config = GenomeConfig(scaled_genome_parameters(args.genome_size), args.genome_seed, args.genome_cache)
+    # With --report, replicate 0 saves its populated genome for the report's genome view
+    snapshot_path = None if args.report is None else os.path.splitext(args.report)[0] + '_genome.npz'
+    element_lengths = simulation.main(engine=args.engine, layout=args.layout, dtype=np.dtype(args.dtype), memmap_dir=args.memmap_dir,
+                    move_mode=args.move_mode, num_simulations=args.replicates, workers=args.workers,
+                    root_seed=args.seed, output_path=args.output, checkpoint_dir=args.checkpoint_dir,
+                    checkpoint_every=args.checkpoint_every, resume=args.resume, metrics_path=args.metrics,
+                    config=config, rounds=args.rounds, coarsen=args.coarsen, backend=args.backend,
+                    snapshot_path=snapshot_path, copy_and_paste=args.copy_and_paste)
+
+    if args.report is not None:
+        from .report import build_report
+        lengths_path = os.path.splitext(args.report)[0] + '_lengths.npz'
+        np.savez(lengths_path, **{name: element_lengths[code] for code, name in element_names.items()})
+        # A resumed run past round 0 keeps the snapshot its first attempt saved, if any
+        genome_path = snapshot_path if os.path.exists(snapshot_path) else None
+        build_report([lengths_path], args.output, args.report, workers=args.workers, genome_path=genome_path)
+    return 0
@@ -0,0 +1,60 @@
+# Packages:
+import numpy as np
+from .grid_storage import allocate_grid
+from .genome_layout import layout_from_grid, write_layout_to_grid
+
+
+# Multi-resolution genomes. Coarsening by a factor k maps every element to
+# round(start / k) with length max(1, round(length / k)) on the same strand, so
+# both strands and every element survive, however short. Elements that would
+# collide after rounding are pushed right just far enough to stay disjoint:
+# along a strand, start'_i = max(s_i, end'_{i-1}), which unrolls to
+# C_i + max_{j <= i}(s_j - C_j) with C the running sum of coarse lengths, one
+# np.maximum.accumulate over all elements. The whole pass is O(n) in elements
+# (plus one sort), with no per-base or per-length scans of the genome.
+def coarsen_element_lengths(genomic_elements_lengths, factor):
+    """ Length arrays scaled down by factor, every element kept at least 1 bp long. """
+    return {element_type: np.maximum(1, np.rint(np.asarray(lengths) / factor)).astype(np.int64)
+            for element_type, lengths in genomic_elements_lengths.items()}
+
+
+def coarsen_layout(layout, factor, width):
+    """ Return the layout coarsened by factor, row for row, and the coarse strand width. """
+    strands, starts, lengths, types = layout
+    order = np.lexsort((starts, strands))
+    sorted_strands = strands[order]
+    coarse_starts = np.rint(starts[order] / factor).astype(np.int64)
+    coarse_lengths = np.maximum(1, np.rint(lengths[order] / factor)).astype(np.int64)
+
+    # Running length sum and running maximum, both restarted at each strand
+    cumulative = np.cumsum(coarse_lengths) - coarse_lengths
+    first_on_strand = np.searchsorted(sorted_strands, sorted_strands)
+    cumulative -= cumulative[first_on_strand]
+    offset = 2 * (int(np.ceil(width / factor)) + int(coarse_lengths.sum()) + 1) * sorted_strands
+    placed = cumulative + np.maximum.accumulate(coarse_starts - cumulative + offset) - offset
+
+    new_starts = np.empty_like(placed)
+    new_lengths = np.empty_like(coarse_lengths)
+    new_starts[order] = placed
+    new_lengths[order] = coarse_lengths
+    new_width = int(np.ceil(width / factor))
+    if len(placed):
+        new_width = max(new_width, int((placed + coarse_lengths).max()))
+    return (strands.copy(), new_starts, new_lengths, types.copy()), new_width
+
+
+def coarsen_grid(grid, factor, element_table=None):
+    """ Coarsen a dense grid by factor; returns the coarse grid and (original layout, coarse layout). """
+    # With an element table every element is kept; from the grid alone, each run of one code is an element
+    if element_table is not None:
+        rows = slice(0, element_table.count)
+        layout = (element_table.strands[rows], element_table.starts[rows],
+                  element_table.lengths[rows], element_table.types[rows])
+    else:
+        layout = layout_from_grid(grid)
+    coarse_layout, coarse_width = coarsen_layout(layout, factor, grid.shape[1])
+    coarse_grid = allocate_grid(grid.shape[0], coarse_width, grid.dtype)
+    strands, starts, lengths, types = coarse_layout
+    order = np.lexsort((starts, strands))
+    write_layout_to_grid(coarse_grid, (strands[order], starts[order], lengths[order], types[order]))
+    return coarse_grid, (layout, coarse_layout)
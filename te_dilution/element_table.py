@@ -0,0 +1,65 @@
+# Packages:
+import numpy as np
+
+
+# Struct-of-arrays table of the elements placed on a dense grid: one row per
+# element with its id, type, strand, start and length. Moves iterate rows of
+# this table instead of np.argwhere(grid == element_type), which returns every
+# base of every element.
+class ElementTable:
+    def __init__(self, capacity=0):
+        self.ids = np.zeros(capacity, dtype=np.int64)
+        self.types = np.zeros(capacity, dtype=np.uint8)
+        self.strands = np.zeros(capacity, dtype=np.int64)
+        self.starts = np.zeros(capacity, dtype=np.int64)
+        self.lengths = np.zeros(capacity, dtype=np.int64)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def grow(self, capacity):
+        for name in ('ids', 'types', 'strands', 'starts', 'lengths'):
+            column = getattr(self, name)
+            grown = np.zeros(capacity, dtype=column.dtype)
+            grown[:self.count] = column[:self.count]
+            setattr(self, name, grown)
+
+    def append(self, element_type, strand, start, length):
+        if self.count == len(self.ids):
+            self.grow(max(2 * len(self.ids), 16))
+        row = self.count
+        self.ids[row] = row
+        self.types[row] = element_type
+        self.strands[row] = strand
+        self.starts[row] = start
+        self.lengths[row] = length
+        self.count += 1
+        return row
+
+    def extend(self, types, strands, starts, lengths):
+        """ Append many elements at once, in order. """
+        if self.count + len(starts) > len(self.ids):
+            self.grow(max(2 * len(self.ids), self.count + len(starts)))
+        rows = slice(self.count, self.count + len(starts))
+        self.ids[rows] = np.arange(rows.start, rows.stop)
+        self.types[rows] = types
+        self.strands[rows] = strands
+        self.starts[rows] = starts
+        self.lengths[rows] = lengths
+        self.count += len(starts)
+
+    def rows_of_type(self, element_type):
+        return np.flatnonzero(self.types[:self.count] == element_type)
+
+
+def element_table_from_layout(layout):
+    strands, starts, lengths, types = layout
+    table = ElementTable(len(starts))
+    table.count = len(starts)
+    table.ids[:] = np.arange(len(starts))
+    table.types[:] = types
+    table.strands[:] = strands
+    table.starts[:] = starts
+    table.lengths[:] = lengths
+    return table
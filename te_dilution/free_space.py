@@ -0,0 +1,192 @@
+# Packages:
+import numpy as np
+from . import kernels
+from .instrumentation import count
+
+
+# Sparse Fenwick (binary indexed) tree over 1..size. Nodes live in a dict, so a
+# tree spanning 180,000,000 gap lengths only stores the ~log(size) nodes touched
+# per distinct length.
+class FenwickTree:
+    def __init__(self, size):
+        self.size = size
+        self.tree = {}
+        self.top_step = 1 << (size.bit_length() - 1) if size > 0 else 0
+
+    def add(self, index, value):
+        while index <= self.size:
+            self.tree[index] = self.tree.get(index, 0) + value
+            index += index & -index
+
+    def prefix_sum(self, index):
+        total = 0
+        while index > 0:
+            total += self.tree.get(index, 0)
+            index -= index & -index
+        return total
+
+
+# Index of the free gaps on every strand. Gaps are keyed by reversed length in
+# two Fenwick trees (gap counts and summed gap lengths), so for an element of
+# length L the number of valid start positions in all gaps that fit it is
+# sum(g) - count * (L - 1) over a prefix of the tree. Sampling descends the
+# trees to a gap length, picks one gap of that length, then an offset in it:
+# every free (strand, start) pair is equally likely, as with shuffling all
+# available positions, and placement costs O(log genome_size).
+class FreeSpaceIndex:
+    def __init__(self, max_length):
+        self.max_length = max_length
+        self.counts = FenwickTree(max_length)
+        self.lengths = FenwickTree(max_length)
+        self.gaps = {}              # gap_id -> (strand, start, length)
+        self.gaps_by_length = {}    # length -> list of gap_ids
+        self.slot = {}              # gap_id -> position in gaps_by_length[length]
+        self.next_id = 0
+
+    def __len__(self):
+        return len(self.gaps)
+
+    def key(self, length):
+        return self.max_length - length + 1
+
+    def add_gap(self, strand, start, length):
+        if length <= 0:
+            return
+        gap_id = self.next_id
+        self.next_id += 1
+        self.gaps[gap_id] = (strand, start, length)
+        same_length = self.gaps_by_length.setdefault(length, [])
+        self.slot[gap_id] = len(same_length)
+        same_length.append(gap_id)
+        self.counts.add(self.key(length), 1)
+        self.lengths.add(self.key(length), length)
+
+    def remove_gap(self, gap_id):
+        strand, start, length = self.gaps.pop(gap_id)
+        # Swap-remove from the per-length list
+        same_length = self.gaps_by_length[length]
+        position = self.slot.pop(gap_id)
+        last = same_length.pop()
+        if last != gap_id:
+            same_length[position] = last
+            self.slot[last] = position
+        if not same_length:
+            del self.gaps_by_length[length]
+        self.counts.add(self.key(length), -1)
+        self.lengths.add(self.key(length), -length)
+        return strand, start, length
+
+    def available_positions(self, length):
+        # Number of (strand, start) pairs where an element of this length fits
+        if length > self.max_length:
+            return 0
+        kmax = self.key(length)
+        return self.lengths.prefix_sum(kmax) - (length - 1) * self.counts.prefix_sum(kmax)
+
+    def find_gap_length(self, length, target):
+        # Smallest key whose prefix weight exceeds target; prefix weights only grow up to key(length)
+        kmax = self.key(length)
+        pos, acc_lengths, acc_counts = 0, 0, 0
+        step = self.counts.top_step
+        while step:
+            nxt = pos + step
+            if nxt <= kmax:
+                nxt_lengths = acc_lengths + self.lengths.tree.get(nxt, 0)
+                nxt_counts = acc_counts + self.counts.tree.get(nxt, 0)
+                if nxt_lengths - (length - 1) * nxt_counts <= target:
+                    pos, acc_lengths, acc_counts = nxt, nxt_lengths, nxt_counts
+            step >>= 1
+        gap_length = self.max_length - pos
+        return gap_length, target - (acc_lengths - (length - 1) * acc_counts)
+
+    def place(self, length, rng):
+        """ Reserve a uniformly chosen free stretch of the given length and return (strand, start). """
+        count('placement_attempts')
+        total = self.available_positions(length)
+        if total <= 0:
+            return None
+        gap_length, target = self.find_gap_length(length, int(rng.integers(0, total)))
+        # Every gap of this length carries the same number of valid starts
+        per_gap = gap_length - length + 1
+        gap_id = self.gaps_by_length[gap_length][target // per_gap]
+        offset = target % per_gap
+        strand, gap_start, gap_length = self.remove_gap(gap_id)
+        start = gap_start + offset
+        self.add_gap(strand, gap_start, offset)
+        self.add_gap(strand, start + length, gap_length - offset - length)
+        return strand, start
+
+
+def largest_first_order(genomic_elements_lengths):
+    """ Element types and lengths as two arrays, longest first. """
+    # Non-coding segments fill the rest of the genome exactly, so the genome ends up half
+    # full; placed last, the longest segments no longer find a free stretch. Placing longest
+    # first still draws each element uniformly over the free stretches that fit it.
+    types = np.concatenate([np.zeros(0, dtype=int)] + [np.full(len(lengths), element_type) for element_type, lengths in genomic_elements_lengths.items()])
+    lengths = np.concatenate([np.zeros(0, dtype=int)] + [np.asarray(lengths, dtype=int) for lengths in genomic_elements_lengths.values()])
+    order = np.argsort(-lengths, kind='stable')
+    return types[order], lengths[order]
+
+
+def largest_first(genomic_elements_lengths):
+    """ (element_type, length) for every element, longest first. """
+    types, lengths = largest_first_order(genomic_elements_lengths)
+    return zip(types.tolist(), lengths.tolist())
+
+
+def zero_runs(row):
+    # Starts and lengths of the runs of empty (0) cells in one strand
+    if kernels.active_backend() == 'numba':
+        return kernels.zero_runs(row)
+    empty = np.concatenate(([False], row == 0, [False]))
+    edges = np.flatnonzero(np.diff(empty.astype(np.int8)))
+    return edges[::2], edges[1::2] - edges[::2]
+
+
+def free_gaps(grid):
+    """ Strands, starts and lengths of the empty stretches of a grid, strand by strand. """
+    runs = [zero_runs(grid[strand]) for strand in range(grid.shape[0])]
+    strands = np.concatenate([np.zeros(0, dtype=np.int64)] + [np.full(len(starts), strand) for strand, (starts, _) in enumerate(runs)])
+    starts = np.concatenate([np.zeros(0, dtype=np.int64)] + [starts for starts, _ in runs])
+    lengths = np.concatenate([np.zeros(0, dtype=np.int64)] + [lengths for _, lengths in runs])
+    return strands, starts, lengths
+
+
+def free_gaps_from_intervals(genome):
+    strands, starts, lengths = [], [], []
+    for strand in range(genome.num_strands):
+        gap_starts = np.concatenate(([0], genome.ends[strand]))
+        gap_ends = np.concatenate((genome.starts[strand], [genome.width]))
+        strands.append(np.full(len(gap_starts), strand))
+        starts.append(gap_starts)
+        lengths.append(gap_ends - gap_starts)
+    return np.concatenate(strands), np.concatenate(starts), np.concatenate(lengths)
+
+
+def free_space_index(gaps, max_length):
+    index = FreeSpaceIndex(max_length)
+    for strand, start, length in zip(*(np.asarray(column).tolist() for column in gaps)):
+        index.add_gap(strand, start, length)
+    return index
+
+
+def build_free_space_index(grid):
+    return free_space_index(free_gaps(grid), grid.shape[1])
+
+
+def build_free_space_index_from_intervals(genome):
+    return free_space_index(free_gaps_from_intervals(genome), genome.width)
+
+
+def place_elements(gaps, max_length, lengths, rng):
+    """ Return (strands, starts, number placed): FreeSpaceIndex.place for each length in turn, in one compiled call. """
+    gap_strands, gap_starts, gap_lengths = gaps
+    # Every placement removes one gap and adds at most two
+    capacity = len(gap_lengths) + 2 * len(lengths)
+    columns = [np.zeros(capacity, dtype=np.int64) for _ in range(3)]
+    for column, values in zip(columns, gaps):
+        column[:len(values)] = values
+    top_step = 1 << (max_length.bit_length() - 1) if max_length > 0 else 0
+    count('placement_attempts', len(lengths))
+    return kernels.place_elements(rng, *columns, len(gap_lengths), max_length, top_step, np.asarray(lengths, dtype=np.int64),
+                                  kernels.new_tree(), kernels.new_tree(), kernels.new_tree(), kernels.new_tree())
@@ -0,0 +1,245 @@
+# Packages:
+import functools
+import hashlib
+import json
+import math
+import os
+import tempfile
+import numpy as np
+from .random_streams import default_generator
+
+
+# Fly genome statistics. A sweep point overrides any of these keys.
+fly_genome_parameters = {
+    'genome_size': 180000000,
+    'mean_gene_length': 462,
+    'min_gene_length': 2,
+    'max_gene_length': 14544,
+    'num_genes': 14000,
+    'retrotransposons_stats': {'mean': 2869, 'min_len': 215, 'max_len': 7490, 'std_dev': 3213},
+    'dnatransposons_stats': {'mean': 2180, 'min_len': 52, 'max_len': 5453, 'std_dev': 2013},
+    'retrotransposons_proportion': 0.18,
+    'dnatransposons_proportion': 0.02,
+    'num_non_coding_segments': 5000,
+    'min_non_coding_length': 100,
+    'num_rounds': 1,
+}
+
+
+def scaled_genome_parameters(genome_size, parameters=fly_genome_parameters):
+    """ parameters shrunk (or grown) to a genome of genome_size bp. """
+    # Element counts scale with the genome; lengths are capped so one element never fills a strand.
+    # Means are clamped into the capped windows: a window far below its mean has no mass to
+    # sample from, and the transposon counts (total length / mean) would round down to nothing
+    scale = genome_size / parameters['genome_size']
+    cap = max(genome_size // 20, 10)
+
+    def clamped(mean, min_len, max_len):
+        return min(max(mean, min_len), max_len)
+
+    def capped(stats):
+        min_len, max_len = min(stats['min_len'], cap // 2), min(stats['max_len'], cap)
+        return {**stats, 'mean': clamped(stats['mean'], min_len, max_len), 'min_len': min_len, 'max_len': max_len}
+
+    min_gene_length = min(parameters['min_gene_length'], cap // 2)
+    max_gene_length = min(parameters['max_gene_length'], cap)
+
+    return {
+        **parameters,
+        'genome_size': genome_size,
+        'num_genes': max(1, round(parameters['num_genes'] * scale)),
+        'mean_gene_length': clamped(parameters['mean_gene_length'], min_gene_length, max_gene_length),
+        'min_gene_length': min_gene_length,
+        'max_gene_length': max_gene_length,
+        'retrotransposons_stats': capped(parameters['retrotransposons_stats']),
+        'dnatransposons_stats': capped(parameters['dnatransposons_stats']),
+        'num_non_coding_segments': max(1, round(parameters['num_non_coding_segments'] * scale)),
+        'min_non_coding_length': min(parameters['min_non_coding_length'], cap // 2),
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def truncated_normal_table(mean, min_val, max_val, stdv):
+    """ Support and alias table of round(X) for X ~ N(mean, stdv) truncated to [min_val, max_val]. """
+    # Lengths are rounded to whole bases, so the rounded distribution is tabulated
+    # exactly: value k covers [k - 0.5, k + 0.5) clipped to the truncation bounds
+    support = np.arange(int(np.round(min_val)), int(np.round(max_val)) + 1)
+    edges = np.clip(np.append(support - 0.5, support[-1] + 0.5), min_val, max_val)
+    # Tail masses come from erfc on the side of the mean the window lies on: 1 + erf(z)
+    # rounds to 0 a few sigma into the left tail, erfc keeps its relative precision
+    z = (edges - mean) / (stdv * math.sqrt(2))
+    if (min_val + max_val) / 2 >= mean:
+        upper_tail = np.array([0.5 * math.erfc(value) for value in z])
+        masses = -np.diff(upper_tail)
+    else:
+        lower_tail = np.array([0.5 * math.erfc(-value) for value in z])
+        masses = np.diff(lower_tail)
+    total_mass = masses.sum()
+    if not total_mass > 0:
+        raise ValueError(f"N({mean}, {stdv}) truncated to [{min_val}, {max_val}] has no probability mass "
+                         f"in double precision; the window is too far into the tail")
+    probabilities = masses / total_mass
+
+    # Walker alias table (Vose's construction): O(1) per draw whatever the support size
+    n = len(support)
+    scaled = probabilities * n
+    accept = np.ones(n)
+    alias = np.arange(n)
+    small = [i for i in range(n) if scaled[i] < 1]
+    large = [i for i in range(n) if scaled[i] >= 1]
+    while small and large:
+        low, high = small.pop(), large.pop()
+        accept[low] = scaled[low]
+        alias[low] = high
+        scaled[high] -= 1 - scaled[low]
+        (small if scaled[high] < 1 else large).append(high)
+    return support, accept, alias
+
+
+def create_truncated_normal_distribution(mean, min_val, max_val, stdv, num_samples, rng=None):
+    # Alias-method draw from the cached table; replaces scipy.stats.truncnorm(...).rvs
+    rng = default_generator(rng)
+    support, accept, alias = truncated_normal_table(mean, min_val, max_val, stdv)
+    column = rng.integers(0, len(support), size=num_samples)
+    column = np.where(rng.random(num_samples) < accept[column], column, alias[column])
+    return support[column].astype(int)
+
+
+def create_non_coding_segments(total_length, num_segments, min_length, rng):
+    """ Split total_length bases into num_segments lengths, each at least min_length, in one O(n) draw. """
+    spare = int(total_length) - num_segments * min_length
+    if spare < 0:
+        raise ValueError(f"Cannot fit {num_segments} non-coding segments of at least {min_length} bp into {total_length} bp")
+    # Shifted flat Dirichlet: normalized exponentials give shares uniform on the simplex
+    shares = rng.exponential(size=num_segments)
+    shares *= spare / shares.sum()
+    extra = np.floor(shares).astype(np.int64)
+    # Hand the bases lost to flooring to the largest fractional parts, so the total is exact
+    shortfall = spare - extra.sum()
+    if shortfall > 0:
+        extra[np.argpartition(extra - shares, shortfall - 1)[:shortfall]] += 1
+    return extra + min_length
+
+
+def sample_element_lengths(parameters, rng):
+    """ Draw the exon, transposon and non-coding length arrays for a genome, keyed by element code 1-4. """
+    genome_size = parameters['genome_size']
+    estimated_std = (parameters['max_gene_length'] - parameters['min_gene_length']) / 6
+    exon_lengths = create_truncated_normal_distribution(
+        parameters['mean_gene_length'], parameters['min_gene_length'],
+        parameters['max_gene_length'], estimated_std, parameters['num_genes'], rng)
+
+    retrotransposons_stats = parameters['retrotransposons_stats']
+    dnatransposons_stats = parameters['dnatransposons_stats']
+
+    genome_minus_exons = genome_size - exon_lengths.sum()
+    if genome_minus_exons < 0:
+        raise ValueError(f"{len(exon_lengths)} exons take {exon_lengths.sum()} bp, more than the {genome_size} bp genome; "
+                         f"scale the element counts with the genome (scaled_genome_parameters)")
+    total_retrotransposons_length = genome_minus_exons * parameters['retrotransposons_proportion']
+    total_dnatransposons_length = genome_minus_exons * parameters['dnatransposons_proportion']
+
+    num_retrotransposons = int(total_retrotransposons_length / retrotransposons_stats['mean'])
+    num_dnatransposons = int(total_dnatransposons_length / dnatransposons_stats['mean'])
+
+    retrotransposons_lengths = create_truncated_normal_distribution(
+        retrotransposons_stats['mean'], retrotransposons_stats['min_len'],
+        retrotransposons_stats['max_len'], retrotransposons_stats['std_dev'], num_retrotransposons, rng)
+
+    dnatransposons_lengths = create_truncated_normal_distribution(
+        dnatransposons_stats['mean'], dnatransposons_stats['min_len'],
+        dnatransposons_stats['max_len'], dnatransposons_stats['std_dev'], num_dnatransposons, rng)
+
+    # Non-Coding Region Calculations
+    total_coding_length = exon_lengths.sum() + retrotransposons_lengths.sum() + dnatransposons_lengths.sum()
+    non_coding_length = genome_size - total_coding_length
+    if non_coding_length < 0:
+        raise ValueError(f"Exons and transposons take {total_coding_length} bp, more than the {genome_size} bp genome")
+    num_non_coding_segments = parameters['num_non_coding_segments']
+
+    non_coding_segment_lengths = create_non_coding_segments(
+        non_coding_length, num_non_coding_segments, parameters['min_non_coding_length'], rng)
+
+    return {
+        1: exon_lengths,
+        2: retrotransposons_lengths,
+        3: dnatransposons_lengths,
+        4: non_coding_segment_lengths
+    }
+
+
+element_names = {
+    1: 'exon_lengths',
+    2: 'retrotransposons_lengths',
+    3: 'dnatransposons_lengths',
+    4: 'non_coding_segment_lengths'
+}
+
+
+# Lazily sampled genome composition. Nothing is drawn until the length arrays
+# are first accessed. With a seed and a cache_dir, the arrays are saved to
+# <cache_dir>/genome_<hash>.npz, keyed by a hash of the parameters and the
+# seed, and later runs with the same configuration load them instead.
+class GenomeConfig:
+    def __init__(self, parameters=None, seed=None, cache_dir=None):
+        self.parameters = {**fly_genome_parameters, **(parameters or {})}
+        self.seed = seed
+        self.cache_dir = cache_dir
+        self._element_lengths = None
+
+    def cache_key(self):
+        # num_rounds does not change the sampled genome, so it stays out of the key
+        sampled = {name: value for name, value in self.parameters.items() if name != 'num_rounds'}
+        payload = json.dumps({'parameters': sampled, 'seed': self.seed}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def cache_path(self):
+        if self.cache_dir is None or self.seed is None:
+            return None
+        return os.path.join(self.cache_dir, f"genome_{self.cache_key()}.npz")
+
+    @property
+    def element_lengths(self):
+        """ Length arrays keyed by element code 1-4, sampled or loaded on first access. """
+        if self._element_lengths is None:
+            path = self.cache_path()
+            if path is not None and os.path.exists(path):
+                with np.load(path) as cached:
+                    self._element_lengths = {code: cached[name] for code, name in element_names.items()}
+            else:
+                rng = np.random.default_rng(self.seed) if self.seed is not None else default_generator()
+                self._element_lengths = sample_element_lengths(self.parameters, rng)
+                if path is not None:
+                    self.save(path)
+        return self._element_lengths
+
+    def save(self, path):
+        """ Write the length arrays to path under their element_names, the layout report.py reads. """
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temporary file of our own first, so a crash never leaves a truncated
+        # cache and replicates saving the same genome at once never share a half-written file
+        descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix='.tmp.npz')
+        try:
+            with os.fdopen(descriptor, 'wb') as temporary_file:
+                np.savez(temporary_file, **{name: self.element_lengths[code] for code, name in element_names.items()})
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    @property
+    def exon_lengths(self):
+        return self.element_lengths[1]
+
+    @property
+    def retrotransposons_lengths(self):
+        return self.element_lengths[2]
+
+    @property
+    def dnatransposons_lengths(self):
+        return self.element_lengths[3]
+
+    @property
+    def non_coding_segment_lengths(self):
+        return self.element_lengths[4]
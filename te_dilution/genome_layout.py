@@ -0,0 +1,87 @@
+# Packages:
+import numpy as np
+from .element_table import element_table_from_layout
+from .run_length import encode_strand
+
+
+# One-shot genome layout: instead of placing elements one at a time, all
+# elements are permuted, assigned a strand, and separated by spacers drawn as a
+# single random partition of each strand's leftover bases. A whole 180 Mb
+# genome is laid out in a handful of NumPy calls.
+def generate_layout(genomic_elements_lengths, grid_height, grid_width, rng):
+    """ Return (strands, starts, lengths, types) arrays for every element, sorted by strand and start. """
+    types = np.concatenate([np.full(len(lengths), element_type, dtype=np.uint8)
+                            for element_type, lengths in genomic_elements_lengths.items()])
+    lengths = np.concatenate([np.asarray(lengths, dtype=np.int64)
+                              for lengths in genomic_elements_lengths.values()])
+
+    order = rng.permutation(len(lengths))
+    types, lengths = types[order], lengths[order]
+    strands = rng.integers(0, grid_height, size=len(lengths))
+
+    # Stable sort keeps the random order of elements within each strand
+    by_strand = np.argsort(strands, kind='stable')
+    strands, types, lengths = strands[by_strand], types[by_strand], lengths[by_strand]
+
+    starts = np.empty(len(lengths), dtype=np.int64)
+    bounds = np.searchsorted(strands, np.arange(grid_height + 1))
+    for strand in range(grid_height):
+        lo, hi = bounds[strand], bounds[strand + 1]
+        strand_lengths = lengths[lo:hi]
+        leftover = grid_width - strand_lengths.sum()
+        if leftover < 0:
+            raise ValueError("No available position to place the element")
+        # k sorted cut points split the leftover bases into k + 1 spacers (before, between and after elements)
+        cuts = np.sort(rng.integers(0, leftover + 1, size=hi - lo))
+        spacers = np.diff(cuts, prepend=0)
+        starts[lo:hi] = np.cumsum(spacers) + np.cumsum(strand_lengths) - strand_lengths
+
+    return strands, starts, lengths, types
+
+
+def write_layout_to_grid(grid, layout):
+    # Expand each strand as alternating empty / element runs in a single np.repeat
+    strands, starts, lengths, types = layout
+    width = grid.shape[1]
+    for strand in range(grid.shape[0]):
+        on_strand = strands == strand
+        strand_starts, strand_lengths = starts[on_strand], lengths[on_strand]
+        ends = strand_starts + strand_lengths
+        gaps = np.diff(np.concatenate(([0], ends))) - strand_lengths
+        codes = np.zeros(2 * len(ends) + 1, dtype=grid.dtype)
+        codes[1::2] = types[on_strand]
+        runs = np.zeros(2 * len(ends) + 1, dtype=np.int64)
+        runs[0:-1:2] = gaps
+        runs[1::2] = strand_lengths
+        runs[-1] = width - (ends[-1] if len(ends) else 0)
+        grid[strand] = np.repeat(codes, runs)
+    return grid
+
+
+def write_layout_to_intervals(genome, layout):
+    strands, starts, lengths, types = layout
+    ids = np.arange(len(starts), dtype=np.int64)
+    for strand in range(genome.num_strands):
+        on_strand = strands == strand
+        genome.starts[strand] = starts[on_strand]
+        genome.ends[strand] = starts[on_strand] + lengths[on_strand]
+        genome.types[strand] = types[on_strand].astype(np.uint8)
+        genome.ids[strand] = ids[on_strand]
+    genome.next_id = len(starts)
+    genome.elements = element_table_from_layout(layout)
+    genome.stats.add_layout(layout)
+    return genome
+
+
+def layout_from_grid(grid):
+    """ Return (strands, starts, lengths, types) of every run of one non-zero code on a dense grid. """
+    # Adjacent elements of the same type share a run, so they come back as one element
+    strands, starts, lengths, types = [], [], [], []
+    for strand in range(grid.shape[0]):
+        run_starts, run_lengths, run_codes = encode_strand(grid[strand])
+        occupied = run_codes != 0
+        strands.append(np.full(occupied.sum(), strand, dtype=np.int64))
+        starts.append(run_starts[occupied])
+        lengths.append(run_lengths[occupied])
+        types.append(run_codes[occupied].astype(np.uint8))
+    return np.concatenate(strands), np.concatenate(starts), np.concatenate(lengths), np.concatenate(types)
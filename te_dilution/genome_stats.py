@@ -0,0 +1,102 @@
+# Packages:
+import logging
+import numpy as np
+
+num_codes = 5
+
+
+# Running composition of a genome: base pairs per strand and code (empty code 0
+# included), strand lengths and element counts per type. The engines update it
+# on every place, overwrite, clear, resize and splice, each at the cost of the
+# edit itself, so a composition or density snapshot is O(1) rather than a
+# count over all 360,000,000 cells.
+class GenomeStats:
+    def __init__(self, num_strands, width):
+        self.bp = np.zeros((num_strands, num_codes), dtype=np.int64)
+        self.strand_lengths = np.zeros(num_strands, dtype=np.int64)
+        self.elements = np.zeros(num_codes, dtype=np.int64)
+        self.reset(width)
+
+    def reset(self, width):
+        # Every strand empty and width bases long
+        self.bp[:] = 0
+        self.bp[:, 0] = width
+        self.strand_lengths[:] = width
+        self.elements[:] = 0
+
+    def copy(self):
+        stats = GenomeStats(len(self.strand_lengths), 0)
+        stats.bp[:] = self.bp
+        stats.strand_lengths[:] = self.strand_lengths
+        stats.elements[:] = self.elements
+        return stats
+
+    def place(self, strand, code, length):
+        """ A new element written over empty bases. """
+        self.bp[strand, 0] -= length
+        self.bp[strand, code] += length
+        self.elements[code] += 1
+
+    def overwrite(self, strand, replaced, code):
+        # replaced: base pairs per code (bincount) of the stretch about to be overwritten with code
+        self.bp[strand, :len(replaced)] -= replaced
+        self.bp[strand, code] += replaced.sum()
+
+    def grow(self, additional_length):
+        # The dense and interval genomes widen every strand at once
+        self.bp[:, 0] += additional_length
+        self.strand_lengths += additional_length
+
+    def insert_run(self, strand, code, length):
+        # Splice: the strand gets longer
+        self.bp[strand, code] += length
+        self.strand_lengths[strand] += length
+
+    def remove_run(self, strand, code, length):
+        self.bp[strand, code] -= length
+        self.strand_lengths[strand] -= length
+
+    def add_layout(self, layout):
+        """ Every element of a layout, written onto an empty genome. """
+        strands, starts, lengths, types = layout
+        np.add.at(self.bp, (strands, types.astype(np.int64)), lengths)
+        self.bp[:, 0] -= np.bincount(strands, weights=lengths, minlength=len(self.strand_lengths)).astype(np.int64)
+        self.elements += np.bincount(types, minlength=num_codes)[:num_codes]
+
+    # O(1) snapshots
+
+    @property
+    def size(self):
+        return int(self.strand_lengths.sum())
+
+    def count_nonzero(self):
+        return self.size - int(self.bp[:, 0].sum())
+
+    def composition(self):
+        """ Base pairs per code 0-4 over the whole genome. """
+        return self.bp.sum(axis=0)
+
+    def occupancy(self):
+        """ Occupied base pairs per strand. """
+        return self.strand_lengths - self.bp[:, 0]
+
+    def snapshot(self):
+        return {
+            'composition': self.composition(),
+            'occupancy': self.occupancy(),
+            'strand_lengths': self.strand_lengths.copy(),
+            'elements': self.elements.copy()
+        }
+
+
+def overwrite_cells(grid, stats, strand, start, end, code):
+    """ grid[strand, start:end] = code, keeping stats in step. """
+    if stats is not None:
+        stats.overwrite(strand, np.bincount(grid[strand, start:end], minlength=num_codes), code)
+    grid[strand, start:end] = code
+
+
+def check_stats_density(stats):
+    non_zero_elements = stats.count_nonzero()
+    total_elements = stats.size
+    logging.info(f"Grid Density: {non_zero_elements}/{total_elements} ({non_zero_elements / total_elements * 100}%)")
@@ -0,0 +1,76 @@
+# Packages:
+import os
+import weakref
+import numpy as np
+from .instrumentation import count
+
+
+# Grid storage options. Cell codes only run from 0 to 4, so a uint8 grid holds
+# the same genome in an eighth of the memory of dtype=int, and backing it with
+# np.memmap lets genomes larger than RAM spill to local disk. Both are plain
+# ndarrays to the grid functions, which work on them unchanged.
+def allocate_grid(grid_height, grid_width, dtype=int, memmap_path=None):
+    if memmap_path is None:
+        return np.zeros((grid_height, grid_width), dtype=dtype)
+    # A fresh memmap file is zero-filled by the OS
+    os.makedirs(os.path.dirname(memmap_path) or '.', exist_ok=True)
+    return np.memmap(memmap_path, dtype=dtype, mode='w+', shape=(grid_height, grid_width))
+
+
+def remove_grid_file(memmap_path):
+    """ Delete a grid's backing file, and the half-grown copy a crash mid-resize can leave next to it. """
+    for path in (memmap_path, memmap_path + '.resize'):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# Amortized growth. A grown grid is the view buffer[:, :width] of a wider,
+# zero-filled buffer whose capacity at least doubles on every reallocation.
+# Growing within capacity only re-slices the buffer, so end-of-genome
+# insertions cost amortized O(1) instead of copying the whole genome each time.
+# Columns past the logical width are never written through the view and stay 0.
+# Only the latest view handed out for a buffer allocated here is re-sliced,
+# never an arbitrary slice of a grid.
+growth_buffers = {}    # id(buffer) -> (weakref to buffer, logical width of its live view)
+
+
+def register_view(buffer, width):
+    key = id(buffer)
+    ref = weakref.ref(buffer, lambda _, key=key: growth_buffers.pop(key, None))
+    growth_buffers[key] = (ref, width)
+    return buffer[:, :width]
+
+
+def grid_capacity(grid):
+    # Capacity of the growth buffer behind a prefix view, or the width of any other grid
+    buffer = grid.base
+    ref, width = growth_buffers.get(id(buffer), (None, None))
+    if ref is None or ref() is not buffer or width != grid.shape[1] or buffer.shape[0] != grid.shape[0]:
+        return grid.shape[1], None
+    if grid.__array_interface__['data'][0] != buffer.__array_interface__['data'][0]:
+        return grid.shape[1], None
+    return buffer.shape[1], buffer
+
+
+def grow_grid(grid, additional_length):
+    """ Return the grid widened by additional_length empty columns, keeping its dtype and backing. """
+    height, width = grid.shape
+    new_width = width + additional_length
+    capacity, buffer = grid_capacity(grid)
+    if buffer is not None and new_width <= capacity:
+        return register_view(buffer, new_width)
+
+    capacity = max(2 * width, new_width)
+    count('resize_bytes_copied', grid.nbytes)
+    if isinstance(grid, np.memmap) and grid.filename is not None:
+        path = grid.filename
+        resized_path = path + '.resize'
+        new_buffer = np.memmap(resized_path, dtype=grid.dtype, mode='w+', shape=(height, capacity))
+        new_buffer[:, :width] = grid
+        new_buffer.flush()
+        os.replace(resized_path, path)
+        new_buffer = np.memmap(path, dtype=grid.dtype, mode='r+', shape=(height, capacity))
+    else:
+        new_buffer = np.zeros((height, capacity), dtype=grid.dtype)
+        new_buffer[:, :width] = grid
+    return register_view(new_buffer, new_width)
@@ -0,0 +1,88 @@
+# Packages:
+import numpy as np
+from .interval_genome import IntervalGenome
+from .run_length import RunLengthGenome
+
+# Display colours per code, matching the length histograms of the report
+code_colors = ['white', 'blue', 'green', 'red', 'purple']
+code_labels = ['Empty', 'Exons', 'Retrotransposons', 'DNA Transposons', 'Non-Coding']
+
+
+# Binned genome views. A figure never needs more columns than it has pixels, so
+# the genome is first reduced to base pairs per code per bin (e.g. 10 kb), and
+# overview and zoomed tiles are drawn from that small summary. The reduction
+# works on runs: the bp of one code up to position x is piecewise linear
+# between run boundaries, so np.interp at the bin edges gives exact per-bin
+# counts in O(runs + bins), without expanding 180,000,000 columns.
+def run_length_view(genome):
+    if isinstance(genome, RunLengthGenome):
+        return genome
+    if isinstance(genome, IntervalGenome):
+        return RunLengthGenome.from_intervals(genome)
+    return RunLengthGenome.from_grid(genome)
+
+
+def binned_composition(genome, bin_size, start=0, end=None):
+    """ Base pairs per code 0-4 in each bin of [start, end): an int array of shape (strands, bins, 5). """
+    genome = run_length_view(genome)
+    end = genome.width if end is None else end
+    edges = np.append(np.arange(start, end, bin_size), end)
+    composition = np.zeros((genome.num_strands, len(edges) - 1, 5), dtype=np.int64)
+    for strand in range(genome.num_strands):
+        starts, lengths, codes = genome.starts[strand], genome.lengths[strand], genome.codes[strand]
+        boundaries = np.append(starts, starts[-1] + lengths[-1]) if len(starts) else np.zeros(1)
+        for code in range(1, 5):
+            covered = np.concatenate(([0], np.cumsum(np.where(codes == code, lengths, 0))))
+            composition[strand, :, code] = np.rint(np.diff(np.interp(edges, boundaries, covered))).astype(np.int64)
+        composition[strand, :, 0] = np.diff(edges) - composition[strand, :, 1:].sum(axis=1)
+    return composition
+
+
+def majority_codes(composition):
+    """ Most common code in each bin, shape (strands, bins). """
+    return composition.argmax(axis=2)
+
+
+def plot_composition(ax, composition, bin_size, start=0, title='Genome Overview'):
+    from matplotlib.colors import ListedColormap
+    end = start + composition.shape[1] * bin_size
+    ax.imshow(majority_codes(composition), aspect='auto', interpolation='nearest',
+              cmap=ListedColormap(code_colors), vmin=0, vmax=4,
+              extent=(start, end, composition.shape[0] - 0.5, -0.5))
+    ax.set_yticks(range(composition.shape[0]))
+    ax.set_title(title)
+    ax.set_xlabel('Position')
+    ax.set_ylabel('Strand')
+
+
+def visualize_genome(genome, bin_size=10000, tile_bins=None, pdf_pages=None, title='Genome Overview'):
+    """ Draw the majority code per bin: one overview, then one figure per tile of tile_bins bins. """
+    import matplotlib.pyplot as plt
+    from matplotlib.patches import Patch
+    composition = binned_composition(genome, bin_size)
+    legend = [Patch(facecolor=color, edgecolor='black', label=label) for color, label in zip(code_colors, code_labels)]
+
+    figures = []
+    fig, ax = plt.subplots(figsize=(10, 3))
+    plot_composition(ax, composition, bin_size, title=f"{title} ({bin_size:,} bp bins)")
+    ax.legend(handles=legend, loc='upper left', bbox_to_anchor=(1, 1))
+    fig.tight_layout()
+    figures.append(fig)
+
+    # Zoomed tiles are slices of the same summary, not new passes over the genome
+    if tile_bins is not None:
+        for first in range(0, composition.shape[1], tile_bins):
+            tile = composition[:, first:first + tile_bins]
+            fig, ax = plt.subplots(figsize=(10, 3))
+            tile_start = first * bin_size
+            plot_composition(ax, tile, bin_size, tile_start,
+                             title=f"{title}: {tile_start:,}-{tile_start + tile.shape[1] * bin_size:,} bp")
+            ax.legend(handles=legend, loc='upper left', bbox_to_anchor=(1, 1))
+            fig.tight_layout()
+            figures.append(fig)
+
+    if pdf_pages is not None:
+        for fig in figures:
+            pdf_pages.savefig(fig)
+            plt.close(fig)
+    return figures
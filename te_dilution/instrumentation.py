@@ -0,0 +1,77 @@
+# Packages:
+import sys
+import time
+from contextlib import nullcontext
+
+try:
+    import resource
+except ImportError:     # not available on Windows
+    resource = None
+
+
+# Lightweight run instrumentation: named phases accumulate wall time and named
+# counters accumulate totals, for one replicate at a time in each process.
+# Recording is off by default; phase() then hands back a shared no-op context
+# and count() returns after one flag check, so instrumented code costs next to
+# nothing in normal runs. Phases nest (move includes interaction_check and
+# resize), so their times are inclusive.
+enabled = False
+phase_times = {}
+counters = {}
+recording_started = None
+disabled_phase = nullcontext()
+
+
+class Phase:
+    __slots__ = ('name', 'started')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        phase_times[self.name] = phase_times.get(self.name, 0.0) + time.perf_counter() - self.started
+
+
+def phase(name):
+    """ Context manager timing a named phase while recording is on. """
+    if not enabled:
+        return disabled_phase
+    return Phase(name)
+
+
+def count(name, amount=1):
+    if enabled:
+        counters[name] = counters.get(name, 0) + amount
+
+
+def peak_rss():
+    """ Peak resident set size of this process so far, in bytes, or None where unsupported. """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def start_recording():
+    global enabled, recording_started
+    phase_times.clear()
+    counters.clear()
+    enabled = True
+    recording_started = time.perf_counter()
+
+
+def stop_recording():
+    """ Stop recording and return the phase times, counters, wall time and peak RSS as a dict. """
+    global enabled
+    enabled = False
+    return {
+        'wall_time': time.perf_counter() - recording_started,
+        'phases': dict(phase_times),
+        'counters': dict(counters),
+        # A worker process runs several replicates, so this is its peak up to the end of this one
+        'peak_rss_bytes': peak_rss(),
+    }
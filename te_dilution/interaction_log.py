@@ -0,0 +1,55 @@
+# Packages:
+import numpy as np
+
+
+# Interaction log as a dense int64 array of shape (rounds, codes, codes):
+# interaction_log[round_num, element_type, adjacent_element] counts how often an
+# element of element_type landed next to adjacent_element. Any pair of codes
+# has a cell, so nothing raises KeyError, per-round accumulation is one
+# bincount, and merging replicates is an array sum. The scalar form
+# interaction_log[round_num][(element_type, adjacent_element)] += 1 still works.
+num_element_codes = 5   # 0 empty, 1 exon, 2 retrotransposon, 3 DNA transposon, 4 non-coding
+
+# Pairs (and their order) written to simulation_results.csv
+interaction_types = [
+    (2, 2), (2, 3), (2, 1), (2, 4),
+    (3, 3), (3, 2), (3, 1), (3, 4)
+]
+
+
+def initialize_interaction_log(num_rounds):
+    return np.zeros((num_rounds, num_element_codes, num_element_codes), dtype=np.int64)
+
+
+def record_interactions(interaction_log, round_num, element_type, adjacent_elements):
+    """ Count a batch of neighbour codes; empty cells and same-type neighbours are not interactions. """
+    counts = np.bincount(np.asarray(adjacent_elements, dtype=np.int64), minlength=num_element_codes)
+    counts[0] = 0
+    counts[element_type] = 0
+    interaction_log[round_num, element_type] += counts
+
+
+def merge_interaction_logs(interaction_logs):
+    return np.sum(interaction_logs, axis=0)
+
+
+def interaction_columns(interaction_log):
+    # Integer columns (round, element_type, adjacent_type, count) for the CSV pairs, round-major
+    num_rounds = interaction_log.shape[0]
+    pairs = np.array(interaction_types)
+    rounds = np.repeat(np.arange(num_rounds), len(pairs))
+    element_types = np.tile(pairs[:, 0], num_rounds)
+    adjacent_types = np.tile(pairs[:, 1], num_rounds)
+    return {
+        'round': rounds,
+        'element_type': element_types,
+        'adjacent_type': adjacent_types,
+        'count': interaction_log[rounds, element_types, adjacent_types]
+    }
+
+
+def interaction_rows(interaction_log):
+    # (round_num, interaction_type, count) in the CSV layout
+    for round_num in range(interaction_log.shape[0]):
+        for interaction_type in interaction_types:
+            yield round_num, interaction_type, int(interaction_log[round_num][interaction_type])
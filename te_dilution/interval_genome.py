@@ -0,0 +1,184 @@
+# Packages:
+import numpy as np
+from . import kernels
+from .free_space import (build_free_space_index_from_intervals, largest_first, largest_first_order,
+                         free_gaps_from_intervals, place_elements)
+from .instrumentation import phase, count
+from .genome_stats import GenomeStats
+from .element_table import ElementTable
+
+
+# Interval-based genome backend. Each strand is kept as sorted, non-overlapping
+# (start, end, type, element_id) arrays, so memory scales with the number of
+# elements (~20k for the fly genome) instead of the 2 x 180,000,000 dense grid.
+# Code 0 (empty) is never stored; any base not covered by an interval is empty.
+# Alongside the intervals, an ElementTable keeps every element's own placement
+# (row = element id), so moves go by element like the dense engine's, not by
+# the fragments that overwrites leave behind.
+class IntervalGenome:
+    def __init__(self, num_strands, width):
+        self.num_strands = num_strands
+        self.width = width
+        self.starts = [np.empty(0, dtype=np.int64) for _ in range(num_strands)]
+        self.ends = [np.empty(0, dtype=np.int64) for _ in range(num_strands)]
+        self.types = [np.empty(0, dtype=np.uint8) for _ in range(num_strands)]
+        self.ids = [np.empty(0, dtype=np.int64) for _ in range(num_strands)]
+        self.next_id = 0
+        self.elements = ElementTable()
+        self.stats = GenomeStats(num_strands, width)
+
+    @property
+    def shape(self):
+        return (self.num_strands, self.width)
+
+    @property
+    def size(self):
+        return self.num_strands * self.width
+
+    def __len__(self):
+        return sum(len(s) for s in self.starts)
+
+    def code_at(self, strand, pos):
+        # Last interval starting at or before pos; it covers pos if it ends after it
+        i = np.searchsorted(self.starts[strand], pos, side='right') - 1
+        if i >= 0 and self.ends[strand][i] > pos:
+            return int(self.types[strand][i])
+        return 0
+
+    def is_free(self, strand, start, length):
+        # Only the last interval starting before the end can overlap [start, start + length)
+        i = np.searchsorted(self.starts[strand], start + length, side='left')
+        return i == 0 or self.ends[strand][i - 1] <= start
+
+    def insert(self, strand, start, length, element_type, element_id=None):
+        """ Store a new interval on an empty stretch and return its element id. """
+        if element_id is None:
+            element_id = self.next_id
+            self.next_id += 1
+            self.elements.append(element_type, strand, start, length)
+            self.stats.place(strand, element_type, length)
+        else:
+            # An existing element moving onto empty bases
+            self.stats.overwrite(strand, np.array([length]), element_type)
+        i = np.searchsorted(self.starts[strand], start)
+        self.starts[strand] = np.insert(self.starts[strand], i, start)
+        self.ends[strand] = np.insert(self.ends[strand], i, start + length)
+        self.types[strand] = np.insert(self.types[strand], i, element_type)
+        self.ids[strand] = np.insert(self.ids[strand], i, element_id)
+        return element_id
+
+    def clear(self, strand, start, end):
+        """ Empty [start, end) on a strand, trimming or splitting any interval it cuts. """
+        starts, ends = self.starts[strand], self.ends[strand]
+        lo = np.searchsorted(ends, start, side='right')
+        hi = np.searchsorted(starts, end, side='left')
+        if lo >= hi:
+            return
+        overlaps = np.minimum(ends[lo:hi], end) - np.maximum(starts[lo:hi], start)
+        self.stats.overwrite(strand, np.bincount(self.types[strand][lo:hi], weights=overlaps, minlength=5).astype(np.int64), 0)
+        keep_starts, keep_ends, keep_types, keep_ids = [], [], [], []
+        # Left remainder of the first overlapped interval
+        if starts[lo] < start:
+            keep_starts.append(starts[lo])
+            keep_ends.append(start)
+            keep_types.append(self.types[strand][lo])
+            keep_ids.append(self.ids[strand][lo])
+        # Right remainder of the last overlapped interval
+        if ends[hi - 1] > end:
+            keep_starts.append(end)
+            keep_ends.append(ends[hi - 1])
+            keep_types.append(self.types[strand][hi - 1])
+            keep_ids.append(self.ids[strand][hi - 1])
+        self.starts[strand] = np.concatenate((starts[:lo], np.array(keep_starts, dtype=np.int64), starts[hi:]))
+        self.ends[strand] = np.concatenate((ends[:lo], np.array(keep_ends, dtype=np.int64), ends[hi:]))
+        self.types[strand] = np.concatenate((self.types[strand][:lo], np.array(keep_types, dtype=np.uint8), self.types[strand][hi:]))
+        self.ids[strand] = np.concatenate((self.ids[strand][:lo], np.array(keep_ids, dtype=np.int64), self.ids[strand][hi:]))
+
+    def write(self, strand, start, length, element_type, element_id=None):
+        # Same overwrite semantics as grid[strand, start:start + length] = element_type
+        self.clear(strand, start, start + length)
+        return self.insert(strand, start, length, element_type, element_id)
+
+    def resize(self, additional_length):
+        self.width += int(additional_length)
+        self.stats.grow(int(additional_length))
+
+    def reset(self):
+        for strand in range(self.num_strands):
+            self.starts[strand] = self.starts[strand][:0]
+            self.ends[strand] = self.ends[strand][:0]
+            self.types[strand] = self.types[strand][:0]
+            self.ids[strand] = self.ids[strand][:0]
+        self.next_id = 0
+        self.elements = ElementTable()
+        self.stats.reset(self.width)
+
+    def count_nonzero(self):
+        return int(sum((e - s).sum() for s, e in zip(self.starts, self.ends)))
+
+    def to_dense(self, dtype=int):
+        grid = np.zeros(self.shape, dtype=dtype)
+        for strand in range(self.num_strands):
+            for s, e, t in zip(self.starts[strand], self.ends[strand], self.types[strand]):
+                grid[strand, s:e] = t
+        return grid
+
+
+def initialize_interval_genome(grid_height, grid_width):
+    return IntervalGenome(grid_height, grid_width)
+
+
+def populate_interval_genome(genome, genomic_elements_lengths, rng):
+    # Uniform over every free (strand, start) pair, like shuffling all available positions in populate_grid
+    if kernels.active_backend() == 'numba':
+        types, lengths = largest_first_order(genomic_elements_lengths)
+        strands, starts, placed = place_elements(free_gaps_from_intervals(genome), genome.width, lengths, rng)
+        if placed < len(lengths):
+            raise ValueError("No available position to place the element")
+        for strand, start, length, element_type in zip(strands.tolist(), starts.tolist(), lengths.tolist(), types.tolist()):
+            genome.insert(strand, start, length, element_type)
+        return
+    free_space = build_free_space_index_from_intervals(genome)
+    for element_type, length in largest_first(genomic_elements_lengths):
+        position = free_space.place(length, rng)
+        if position is None:
+            raise ValueError("No available position to place the element")
+        strand, start = position
+        genome.insert(strand, start, length, element_type)
+
+
+def check_and_record_interactions_intervals(genome, strand, start_pos, element_length, element_type, interaction_log, round_num):
+    end_pos = start_pos + element_length
+    for pos in (start_pos - 1, end_pos):
+        if 0 <= pos < genome.width:
+            adjacent_element = genome.code_at(strand, pos)
+            if adjacent_element != 0 and adjacent_element != element_type:
+                interaction_type = (element_type, adjacent_element)
+                interaction_log[round_num][interaction_type] += 1
+
+
+def move_element_intervals(genome, element_type, interaction_log, round_num, rng):
+    # One move per element, in id order, as move_element_optimized does: an element split
+    # or shortened by later writes still moves once, clearing and writing its full extent
+    elements = genome.elements
+    element_ids = elements.rows_of_type(element_type)
+    count('elements_moved', len(element_ids))
+
+    for element_id in element_ids.tolist():
+        strand, start_pos = int(elements.strands[element_id]), int(elements.starts[element_id])
+        element_length = int(elements.lengths[element_id])
+        new_strand = int(rng.integers(0, genome.num_strands))
+        new_start_pos = int(rng.integers(0, genome.width))
+
+        if new_start_pos + element_length > genome.width:
+            genome.resize(new_start_pos + element_length - genome.width)
+
+        with phase('interaction_check'):
+            check_and_record_interactions_intervals(genome, new_strand, new_start_pos, element_length, element_type, interaction_log, round_num)
+
+        genome.clear(strand, start_pos, start_pos + element_length)
+        genome.write(new_strand, new_start_pos, element_length, element_type, element_id)
+        elements.strands[element_id] = new_strand
+        elements.starts[element_id] = new_start_pos
+
+    return genome
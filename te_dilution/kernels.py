@@ -0,0 +1,249 @@
+# Packages:
+import os
+import numpy as np
+
+
+# Optional compiled kernels. The per-element loops of the free-gap search
+# (FreeSpaceIndex.place over a whole populate), the empty-run scan and dense
+# moves with their neighbour checks are written below as plain Python over
+# arrays, ints and dicts. With Numba installed they are compiled to machine
+# code and the callers switch to them; without it the callers keep their NumPy
+# paths. Random draws are the same np.random.Generator calls in the same order
+# either way, so a seed gives the same genome and interaction log on both.
+#
+# The backend is chosen on first use, not at import (importing Numba costs more
+# than the rest of startup): TE_DILUTION_BACKEND=numba|numpy|auto, or
+# use_backend(). 'auto' takes Numba when it is installed.
+backend = None
+compiled_kernels = None
+
+
+def fenwick_add(tree, size, index, value):
+    while index <= size:
+        tree[index] = tree.get(index, 0) + value
+        index += index & -index
+
+
+def fenwick_prefix_sum(tree, index):
+    total = 0
+    while index > 0:
+        total += tree.get(index, 0)
+        index -= index & -index
+    return total
+
+
+def fenwick_descend(counts, sums, top_step, kmax, length, target):
+    # Largest key <= kmax whose prefix weight sum(g) - count * (length - 1) stays <= target,
+    # with the prefix sums up to it
+    pos, acc_sums, acc_counts = 0, 0, 0
+    step = top_step
+    while step:
+        nxt = pos + step
+        if nxt <= kmax:
+            nxt_sums = acc_sums + sums.get(nxt, 0)
+            nxt_counts = acc_counts + counts.get(nxt, 0)
+            if nxt_sums - (length - 1) * nxt_counts <= target:
+                pos, acc_sums, acc_counts = nxt, nxt_sums, nxt_counts
+        step >>= 1
+    return pos, acc_sums, acc_counts
+
+
+def zero_runs(row):
+    # Starts and lengths of the runs of empty cells: one pass to count them, one to fill them in
+    if len(row) == 0:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    num_runs = np.int64(row[0] == 0)
+    for cell in range(1, len(row)):
+        num_runs += (row[cell] == 0) & (row[cell - 1] != 0)
+    starts = np.empty(num_runs, dtype=np.int64)
+    lengths = np.empty(num_runs, dtype=np.int64)
+    run = 0
+    if row[0] == 0:
+        starts[0] = 0
+        run = 1
+    for cell in range(1, len(row)):
+        if row[cell] == 0:
+            if row[cell - 1] != 0:
+                starts[run] = cell
+                run += 1
+        elif row[cell - 1] == 0:
+            lengths[run - 1] = cell - starts[run - 1]
+    if row[len(row) - 1] == 0:
+        lengths[run - 1] = len(row) - starts[run - 1]
+    return starts, lengths
+
+
+def place_elements(rng, gap_strands, gap_starts, gap_lengths, num_gaps, max_length, top_step, lengths,
+                   counts, sums, list_sizes, list_items):
+    # FreeSpaceIndex.place for every length in turn, as one loop. Gap ids, the
+    # per-length lists (list_items[length * capacity + position] -> gap id, with
+    # swap-removal) and the Fenwick trees follow free_space.py step by step, so
+    # each element lands where FreeSpaceIndex would put it. gap_* arrays hold the
+    # num_gaps starting gaps and room for two new ones per element. Returns the
+    # strands and starts, and how many elements were placed before one did not fit.
+    capacity = len(gap_lengths)
+    slots = np.zeros(capacity, dtype=np.int64)
+    next_id = 0
+    for gap_id in range(num_gaps):
+        length = gap_lengths[gap_id]
+        if length > 0:
+            gap_strands[next_id], gap_starts[next_id], gap_lengths[next_id] = gap_strands[gap_id], gap_starts[gap_id], length
+            size = list_sizes.get(length, 0)
+            list_items[length * capacity + size] = next_id
+            list_sizes[length] = size + 1
+            slots[next_id] = size
+            fenwick_add(counts, max_length, max_length - length + 1, 1)
+            fenwick_add(sums, max_length, max_length - length + 1, length)
+            next_id += 1
+
+    strands = np.zeros(len(lengths), dtype=np.int64)
+    starts = np.zeros(len(lengths), dtype=np.int64)
+    for i in range(len(lengths)):
+        length = lengths[i]
+        if length > max_length:
+            return strands, starts, i
+        kmax = max_length - length + 1
+        total = fenwick_prefix_sum(sums, kmax) - (length - 1) * fenwick_prefix_sum(counts, kmax)
+        if total <= 0:
+            return strands, starts, i
+        target = rng.integers(0, total)
+        pos, acc_sums, acc_counts = fenwick_descend(counts, sums, top_step, kmax, length, target)
+        gap_length = max_length - pos
+        target -= acc_sums - (length - 1) * acc_counts
+        per_gap = gap_length - length + 1
+        gap_id = list_items[gap_length * capacity + target // per_gap]
+        offset = target % per_gap
+
+        # Remove the gap: swap the last gap of its length into its slot
+        size = list_sizes[gap_length] - 1
+        last = list_items[gap_length * capacity + size]
+        del list_items[gap_length * capacity + size]
+        if last != gap_id:
+            list_items[gap_length * capacity + slots[gap_id]] = last
+            slots[last] = slots[gap_id]
+        if size:
+            list_sizes[gap_length] = size
+        else:
+            del list_sizes[gap_length]
+        fenwick_add(counts, max_length, pos + 1, -1)
+        fenwick_add(sums, max_length, pos + 1, -gap_length)
+
+        strand, gap_start = gap_strands[gap_id], gap_starts[gap_id]
+        strands[i], starts[i] = strand, gap_start + offset
+        # The stretches left before and after the element, in that order
+        for new_start, new_length in ((gap_start, offset), (gap_start + offset + length, gap_length - offset - length)):
+            if new_length > 0:
+                gap_strands[next_id], gap_starts[next_id], gap_lengths[next_id] = strand, new_start, new_length
+                size = list_sizes.get(new_length, 0)
+                list_items[new_length * capacity + size] = next_id
+                list_sizes[new_length] = size + 1
+                slots[next_id] = size
+                fenwick_add(counts, max_length, max_length - new_length + 1, 1)
+                fenwick_add(sums, max_length, max_length - new_length + 1, new_length)
+                next_id += 1
+    return strands, starts, len(lengths)
+
+
+def write_elements(grid, strands, starts, lengths, types):
+    for i in range(len(starts)):
+        grid[strands[i], starts[i]:starts[i] + lengths[i]] = types[i]
+
+
+def draw_moves(rng, lengths, height, width):
+    # New (strand, start) per element, drawn in move order. Width grows as moves run
+    # past the end, and each draw uses the width at its turn, as the move loop does
+    new_strands = np.empty(len(lengths), dtype=np.int64)
+    new_starts = np.empty(len(lengths), dtype=np.int64)
+    for i in range(len(lengths)):
+        new_strands[i] = rng.integers(0, height)
+        new_starts[i] = rng.integers(0, width)
+        if new_starts[i] + lengths[i] > width:
+            width = new_starts[i] + lengths[i]
+    return new_strands, new_starts, width
+
+
+def overwrite_run(grid, bp, strand, start, end, code):
+    # grid[strand, start:end] = code, taking the replaced codes off the strand's running bp counts
+    exons, retrotransposons, dnatransposons, non_coding = 0, 0, 0, 0
+    for cell in range(start, end):
+        replaced = grid[strand, cell]
+        exons += replaced == 1
+        retrotransposons += replaced == 2
+        dnatransposons += replaced == 3
+        non_coding += replaced == 4
+    bp[strand, 0] -= end - start - exons - retrotransposons - dnatransposons - non_coding
+    bp[strand, 1] -= exons
+    bp[strand, 2] -= retrotransposons
+    bp[strand, 3] -= dnatransposons
+    bp[strand, 4] -= non_coding
+    bp[strand, code] += end - start
+    grid[strand, start:end] = code
+
+
+def move_cells(grid, rows, strands, starts, lengths, new_strands, new_starts, element_type, round_log, bp):
+    # move_element_optimized's loop over an already widened grid. Columns past the
+    # width a move would have seen are still empty at its turn, so neighbour checks agree.
+    for i in range(len(rows)):
+        row = rows[i]
+        strand, start, length = strands[row], starts[row], lengths[row]
+        new_strand, new_start = new_strands[i], new_starts[i]
+        for pos in (new_start - 1, new_start + length):
+            if 0 <= pos < grid.shape[1]:
+                adjacent_element = grid[new_strand, pos]
+                if adjacent_element != 0 and adjacent_element != element_type:
+                    round_log[element_type, adjacent_element] += 1
+        overwrite_run(grid, bp, strand, start, start + length, 0)
+        overwrite_run(grid, bp, new_strand, new_start, new_start + length, element_type)
+        strands[row] = new_strand
+        starts[row] = new_start
+
+
+python_kernels = {
+    'fenwick_add': fenwick_add,
+    'fenwick_prefix_sum': fenwick_prefix_sum,
+    'fenwick_descend': fenwick_descend,
+    'zero_runs': zero_runs,
+    'place_elements': place_elements,
+    'write_elements': write_elements,
+    'draw_moves': draw_moves,
+    'overwrite_run': overwrite_run,
+    'move_cells': move_cells,
+}
+
+
+def use_backend(name='auto'):
+    """ Switch to the 'numba' or 'numpy' kernels ('auto': Numba if installed) and return the active name. """
+    global backend, compiled_kernels
+    if name not in ('auto', 'numba', 'numpy'):
+        raise ValueError(f"Unknown kernel backend: {name}")
+    numba = None
+    if name != 'numpy':
+        try:
+            import numba
+        except ImportError:
+            if name == 'numba':
+                raise
+    if numba is None:
+        globals().update(python_kernels)
+        backend = 'numpy'
+    else:
+        if compiled_kernels is None:
+            # cache=True keeps the machine code in __pycache__, so later processes skip compilation
+            compiled_kernels = {kernel: numba.njit(cache=True)(function) for kernel, function in python_kernels.items()}
+        globals().update(compiled_kernels)
+        backend = 'numba'
+    return backend
+
+
+def active_backend():
+    if backend is None:
+        use_backend(os.environ.get('TE_DILUTION_BACKEND', 'auto'))
+    return backend
+
+
+def new_tree():
+    # Fenwick node store: a plain dict, or a typed dict the compiled kernels can take
+    if active_backend() == 'numba':
+        from numba import typed, types
+        return typed.Dict.empty(types.int64, types.int64)
+    return {}
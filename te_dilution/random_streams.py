@@ -0,0 +1,20 @@
+# Packages:
+import numpy as np
+
+
+# Random streams. Every function that draws random numbers takes an explicit
+# np.random.Generator, so replicates can run in any process without sharing
+# the global np.random state.
+def default_generator(rng=None):
+    # Callers that don't pass a Generator get one drawn from the legacy global
+    # state, so np.random.seed() still pins the whole run
+    if rng is None:
+        return np.random.default_rng(np.random.randint(0, 2**31 - 1))
+    return rng
+
+
+def replicate_seeds(root_seed, num_replicates):
+    """ Spawn one independent 64-bit seed per replicate from a root SeedSequence. """
+    root = np.random.SeedSequence(root_seed)
+    children = root.spawn(num_replicates)
+    return root.entropy, [int(child.generate_state(1, dtype=np.uint64)[0]) for child in children]
@@ -0,0 +1,27 @@
+# Packages:
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from .random_streams import replicate_seeds
+
+
+# Fans replicates out over a process pool. Replicate i always gets the i-th
+# seed spawned from the root SeedSequence, and results come back in replicate
+# order, so a run is bit-for-bit identical whatever the worker count.
+def iter_replicates(run_replicate, num_replicates, workers=1, root_seed=None, **options):
+    """ Call run_replicate(i, seed=..., **options) for every replicate and yield each result, in replicate order. """
+    root_entropy, seeds = replicate_seeds(root_seed, num_replicates)
+    logging.info(f"Running {num_replicates} replicates on {workers} workers from root seed: {root_entropy}")
+    run = partial(run_replicate, **options)
+    if workers == 1:
+        for i, seed in enumerate(seeds):
+            yield run(i, seed=seed)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run, i, seed=seed) for i, seed in enumerate(seeds)]
+        for future in futures:
+            yield future.result()
+
+
+def run_replicates(run_replicate, num_replicates, workers=1, root_seed=None, **options):
+    return list(iter_replicates(run_replicate, num_replicates, workers, root_seed, **options))
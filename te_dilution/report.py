@@ -0,0 +1,245 @@
+# Packages:
+import argparse
+import csv
+import glob
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .genome_composition import element_names
+from .grid_view import visualize_genome
+from .interaction_log import interaction_types
+from .results_writer import read_results
+from .run_length import RunLengthGenome
+
+
+# Out-of-band report: reads saved length arrays (GenomeConfig cache files or
+# any .npz with the same names) and saved results, and renders the length
+# histograms, the composition pie chart and the interaction trends into one
+# PDF, after the simulations have finished. Given a RunLengthGenome snapshot,
+# the report also gets a binned view of that genome (see grid_view.py).
+#
+# Histograms use bin edges fixed up front, from the length range over every
+# file, and counts are accumulated one file at a time, so thousands of
+# replicate genomes are never in memory together. The results are streamed
+# the same way.
+#
+# With workers > 1 each page is drawn to pixels in a worker process and the
+# parent only embeds the finished images; with one worker pages stay vector.
+#
+#   python -m te_dilution.report --lengths .genome_cache --results simulation_results.csv --output genome_figures.pdf
+#   python -m te_dilution.report --lengths run_lengths.npz --genome run_genome.npz --output genome_figures.pdf
+histogram_styles = {
+    1: ('Exon Lengths Distribution', 'blue'),
+    2: ('Retrotransposons Lengths Distribution', 'green'),
+    3: ('DNA Transposons Lengths Distribution', 'red'),
+    4: ('Non-Coding Segments Length Distribution', 'purple'),
+}
+composition_labels = ['Exons', 'Retrotransposons', 'DNA Transposons', 'Non-Coding']
+
+
+def length_files(paths):
+    # Directories stand for every GenomeConfig cache file in them
+    files = []
+    for path in paths:
+        files.extend(sorted(glob.glob(os.path.join(path, 'genome_*.npz'))) if os.path.isdir(path) else [path])
+    return files
+
+
+def length_histograms(paths, num_bins=50, bin_edges=None):
+    """ Return ({code: (edges, counts)}, {code: total bp}, number of genomes) over the length files. """
+    files = length_files(paths)
+    if bin_edges is None:
+        # First pass: the length range per code, one file at a time
+        low = {code: np.inf for code in element_names}
+        high = {code: -np.inf for code in element_names}
+        for path in files:
+            with np.load(path) as saved:
+                for code, name in element_names.items():
+                    lengths = saved[name]
+                    if len(lengths):
+                        low[code] = min(low[code], lengths.min())
+                        high[code] = max(high[code], lengths.max())
+        bin_edges = {code: np.linspace(low[code], high[code] if high[code] > low[code] else low[code] + 1, num_bins + 1)
+                     if np.isfinite(low[code]) else np.linspace(0, 1, num_bins + 1) for code in element_names}
+
+    counts = {code: np.zeros(len(bin_edges[code]) - 1, dtype=np.int64) for code in element_names}
+    totals = dict.fromkeys(element_names, 0)
+    for path in files:
+        with np.load(path) as saved:
+            for code, name in element_names.items():
+                lengths = saved[name]
+                counts[code] += np.histogram(lengths, bin_edges[code])[0]
+                totals[code] += int(lengths.sum())
+    histograms = {code: (bin_edges[code], counts[code]) for code in element_names}
+    return histograms, totals, len(files)
+
+
+def csv_rows(results_path):
+    # (replicate key, round, element type, adjacent type, count) per row of a results CSV
+    with open(results_path, newline='') as csvfile:
+        reader = csv.DictReader(csvfile)
+        if 'round' in reader.fieldnames:
+            for row in reader:
+                key = (row.get('point'), row.get('replicate', row.get('simulation_number')), row['seed'])
+                yield key, int(row['round']), int(row['element_type']), int(row['adjacent_type']), int(row['count'])
+            return
+        # Original layout: no round column, each replicate lists the interaction pairs round after round
+        seen = {}
+        for row in reader:
+            element_type, adjacent_type = (int(code) for code in row['interaction'].strip('()').split(','))
+            key = (row['simulation_number'], row['seed'])
+            round_num = seen.get((key, element_type, adjacent_type), 0)
+            seen[key, element_type, adjacent_type] = round_num + 1
+            yield key, round_num, element_type, adjacent_type, int(row['count'])
+
+
+def result_chunks(results_path, chunk_rows=100000):
+    """ Yield (replicate keys, rounds, element types, adjacent types, counts) chunk by chunk. """
+    if results_path.endswith('.csv'):
+        rows = csv_rows(results_path)
+        while True:
+            chunk = list(itertools.islice(rows, chunk_rows))
+            if not chunk:
+                return
+            keys, rounds, element_types, adjacent_types, counts = zip(*chunk)
+            yield list(keys), np.array(rounds), np.array(element_types), np.array(adjacent_types), np.array(counts)
+
+    results = read_results(results_path)
+    if isinstance(results, list):
+        chunks = ({name: shard[name] for name in shard.dtype.names} for shard in results)
+    else:
+        # A pyarrow Table: one record batch at a time
+        chunks = ({name: np.asarray(column) for name, column in batch.to_pydict().items()} for batch in results.to_batches())
+    for columns in chunks:
+        replicate = columns['replicate'] if 'replicate' in columns else columns['simulation_number']
+        point = columns['point'] if 'point' in columns else np.zeros(len(replicate), dtype=np.int64)
+        keys = list(zip(point.tolist(), replicate.tolist(), columns['seed'].tolist()))
+        yield keys, columns['round'], columns['element_type'], columns['adjacent_type'], columns['count']
+
+
+def interaction_trends(results_path):
+    """ Mean count per round (rows) and interaction pair (columns, in interaction_types order). """
+    pair_index = np.full((5, 5), -1)
+    for i, (element_type, adjacent_type) in enumerate(interaction_types):
+        pair_index[element_type, adjacent_type] = i
+    sums = np.zeros((0, len(interaction_types)))
+    replicates = set()
+    for keys, rounds, element_types, adjacent_types, counts in result_chunks(results_path):
+        replicates.update(keys)
+        rounds = rounds.astype(np.int64)
+        columns = pair_index[element_types.astype(np.int64), adjacent_types.astype(np.int64)]
+        keep = columns >= 0
+        if len(rounds) and rounds.max() >= len(sums):
+            sums = np.vstack((sums, np.zeros((rounds.max() + 1 - len(sums), len(interaction_types)))))
+        np.add.at(sums, (rounds[keep], columns[keep]), counts[keep])
+    return sums / max(len(replicates), 1)
+
+
+# Pages. Each takes plain arrays and returns a matplotlib Figure.
+
+def histogram_page(histograms):
+    import matplotlib.pyplot as plt
+    fig, axs = plt.subplots(4, 1, figsize=(12, 16))
+    for ax, code in zip(axs, histogram_styles):
+        title, color = histogram_styles[code]
+        edges, counts = histograms[code]
+        ax.stairs(counts, edges, fill=True, color=color, alpha=0.7)
+        ax.set_title(title)
+        ax.set_xlabel('Length')
+        ax.set_ylabel('Frequency')
+    fig.tight_layout()
+    return fig
+
+
+def composition_page(totals):
+    import matplotlib.pyplot as plt
+    fig = plt.figure(figsize=(8, 8))
+    plt.pie([totals[code] for code in histogram_styles], labels=composition_labels, autopct='%1.1f%%', shadow=True, startangle=140)
+    plt.title('Genome Composition')
+    return fig
+
+
+def trends_page(trends):
+    import matplotlib.pyplot as plt
+    fig = plt.figure(figsize=(10, 6))
+    for i, interaction_type in enumerate(interaction_types):
+        plt.plot(range(len(trends)), trends[:, i], label=f'Interaction {interaction_type}')
+    plt.xlabel('Simulation Round')
+    plt.ylabel('Mean Number of Interactions')
+    plt.title('Interaction Trends Over Simulation Rounds')
+    plt.legend()
+    plt.tight_layout()
+    return fig
+
+
+def genome_page(genome):
+    # About 1,000 bins across the genome: more columns than the page has pixels would not show
+    bin_size = max(1, -(-genome.width // 1000))
+    return visualize_genome(genome, bin_size, title='Initial Genome, Replicate 0')[0]
+
+
+page_makers = {'histograms': histogram_page, 'composition': composition_page, 'trends': trends_page,
+               'genome': genome_page}
+
+
+def render_page(page, data, dpi):
+    """ Draw one page in a worker process and return its pixels (height x width x RGBA). """
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    fig = page_makers[page](data)
+    fig.set_dpi(dpi)
+    fig.canvas.draw()
+    pixels = np.asarray(fig.canvas.buffer_rgba()).copy()
+    plt.close(fig)
+    return pixels
+
+
+def build_report(lengths, results_path=None, output_path='genome_figures.pdf', workers=1, num_bins=50, dpi=150,
+                 genome_path=None):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_pdf import PdfPages
+
+    histograms, totals, _ = length_histograms(lengths, num_bins)
+    pages = [('histograms', histograms), ('composition', totals)]
+    if results_path is not None:
+        pages.append(('trends', interaction_trends(results_path)))
+    if genome_path is not None:
+        pages.append(('genome', RunLengthGenome.load(genome_path)))
+
+    with PdfPages(output_path) as pdf_pages:
+        if workers == 1:
+            for page, data in pages:
+                fig = page_makers[page](data)
+                pdf_pages.savefig(fig)
+                plt.close(fig)
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                futures = [pool.submit(render_page, page, data, dpi) for page, data in pages]
+                for future in futures:
+                    pixels = future.result()
+                    fig = plt.figure(figsize=(pixels.shape[1] / dpi, pixels.shape[0] / dpi), dpi=dpi)
+                    fig.figimage(pixels, resize=False)
+                    pdf_pages.savefig(fig, dpi=dpi)
+                    plt.close(fig)
+    return output_path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render the genome and interaction figures from saved runs.")
+    parser.add_argument('--lengths', nargs='+', default=['.genome_cache'],
+                        help="length .npz files, or directories of GenomeConfig cache files")
+    parser.add_argument('--results', default=None, help="results written by main() or run_sweep (.csv, .parquet or shard directory)")
+    parser.add_argument('--genome', default=None, help="RunLengthGenome snapshot (.npz) to draw a genome view from")
+    parser.add_argument('--output', default='genome_figures.pdf')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--bins', type=int, default=50)
+    args = parser.parse_args(argv)
+    build_report(args.lengths, args.results, args.output, args.workers, args.bins, genome_path=args.genome)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+# Packages:
+import glob
+import importlib.util
+import os
+import warnings
+import numpy as np
+
+
+# Streaming columnar results. Each write() appends one chunk (typically one
+# replicate) and nothing is kept in memory afterwards. Output is Parquet when
+# pyarrow is installed (one row group per chunk), otherwise a directory of
+# part-NNNNN.npy shards, each a structured array that np.load can memory-map.
+def parquet_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+class ResultsWriter:
+    def __init__(self, output_path, columns):
+        """ columns: list of (name, dtype) pairs, in output order. """
+        self.dtype = np.dtype(columns)
+        self.parquet_writer = None
+        self.num_chunks = 0
+        if output_path.endswith('.parquet') and parquet_available():
+            self.format = 'parquet'
+            self.output_path = output_path
+        else:
+            if output_path.endswith('.parquet'):
+                shards_path = os.path.splitext(output_path)[0] + '.shards'
+                warnings.warn(f"pyarrow is not installed; writing .npy shards to {shards_path} instead of {output_path}")
+                output_path = shards_path
+            self.format = 'npy'
+            self.output_path = output_path
+            os.makedirs(output_path, exist_ok=True)
+            # A rerun into the same directory replaces its results: shards left by an
+            # earlier, larger run would otherwise be read back as part of this one
+            for stale_path in glob.glob(os.path.join(output_path, 'part-*.npy*')):
+                os.remove(stale_path)
+
+    def write(self, columns):
+        """ Append one chunk given as {name: array or scalar}; scalars fill the whole column. """
+        chunk = np.empty(max(np.size(value) for value in columns.values()), dtype=self.dtype)
+        for name in self.dtype.names:
+            chunk[name] = columns[name]
+        if self.format == 'parquet':
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            table = pa.Table.from_pydict({name: chunk[name] for name in self.dtype.names})
+            if self.parquet_writer is None:
+                self.parquet_writer = pq.ParquetWriter(self.output_path, table.schema)
+            self.parquet_writer.write_table(table)
+        else:
+            # Write under a temporary name so readers never see a half-written shard
+            shard_path = os.path.join(self.output_path, f"part-{self.num_chunks:05d}.npy")
+            with open(shard_path + '.tmp', 'wb') as shard:
+                np.save(shard, chunk)
+            os.replace(shard_path + '.tmp', shard_path)
+        self.num_chunks += 1
+
+    def close(self):
+        if self.parquet_writer is not None:
+            self.parquet_writer.close()
+            self.parquet_writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_results(output_path, mmap_mode='r'):
+    """ Load results written by ResultsWriter: a pyarrow Table for Parquet, else a list of memory-mapped shards. """
+    if output_path.endswith('.parquet') and os.path.isfile(output_path):
+        import pyarrow.parquet as pq
+        return pq.read_table(output_path)
+    if output_path.endswith('.parquet'):
+        output_path = os.path.splitext(output_path)[0] + '.shards'
+    return [np.load(path, mmap_mode=mmap_mode) for path in sorted(glob.glob(os.path.join(output_path, 'part-*.npy')))]
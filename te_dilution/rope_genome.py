@@ -0,0 +1,258 @@
+# Packages:
+import numpy as np
+from .instrumentation import phase, count
+from .genome_stats import GenomeStats
+
+NIL = -1
+
+
+# Rope genome with true insertion semantics. Each strand is an implicit treap
+# (randomized balanced tree ordered by position) of runs: (code, length),
+# identified by node number.
+# Subtree base-pair totals give the position of any run in O(log n), and
+# split/merge splice a run in or out so everything downstream shifts, at
+# O(log n) per insertion instead of an O(genome) np.insert.
+# Empty stretches (code 0) are runs too. An insertion that lands inside a run
+# splits it; the right-hand piece becomes a new run of the same code.
+# Nodes live in parallel Python lists indexed by node number, shared by all strands.
+class RopeGenome:
+    def __init__(self, num_strands, rng):
+        self.num_strands = num_strands
+        self.roots = [NIL] * num_strands
+        self.left, self.right, self.parent = [], [], []
+        self.priority, self.length, self.code = [], [], []
+        self.total = []         # base pairs in the subtree
+        self.rng = rng
+        self.stats = GenomeStats(num_strands, 0)
+
+    # Node storage
+
+    def new_node(self, code, length):
+        self.left.append(NIL)
+        self.right.append(NIL)
+        self.parent.append(NIL)
+        self.priority.append(self.rng.random())
+        self.length.append(length)
+        self.code.append(code)
+        self.total.append(length)
+        return len(self.code) - 1
+
+    def update(self, node):
+        left, right = self.left[node], self.right[node]
+        total = self.length[node]
+        if left != NIL:
+            total += self.total[left]
+            self.parent[left] = node
+        if right != NIL:
+            total += self.total[right]
+            self.parent[right] = node
+        self.total[node] = total
+
+    # Treap primitives
+
+    def merge(self, a, b):
+        if a == NIL:
+            return b
+        if b == NIL:
+            return a
+        if self.priority[a] > self.priority[b]:
+            self.right[a] = self.merge(self.right[a], b)
+            self.update(a)
+            self.parent[a] = NIL
+            return a
+        self.left[b] = self.merge(a, self.left[b])
+        self.update(b)
+        self.parent[b] = NIL
+        return b
+
+    def split(self, node, k):
+        """ Split a subtree into its first k base pairs and the rest, cutting a run if k falls inside it. """
+        if node == NIL:
+            return NIL, NIL
+        left_total = self.total[self.left[node]] if self.left[node] != NIL else 0
+        if k <= left_total:
+            a, b = self.split(self.left[node], k)
+            self.left[node] = b
+            self.update(node)
+            self.parent[node] = NIL
+            if a != NIL:
+                self.parent[a] = NIL
+            return a, node
+        if k >= left_total + self.length[node]:
+            a, b = self.split(self.right[node], k - left_total - self.length[node])
+            self.right[node] = a
+            self.update(node)
+            self.parent[node] = NIL
+            if b != NIL:
+                self.parent[b] = NIL
+            return node, b
+        offset = k - left_total
+        remainder = self.new_node(self.code[node], self.length[node] - offset)
+        self.length[node] = offset
+        right = self.right[node]
+        self.right[node] = NIL
+        if right != NIL:
+            self.parent[right] = NIL
+        self.update(node)
+        self.parent[node] = NIL
+        return node, self.merge(remainder, right)
+
+    def build(self, strand, codes, lengths):
+        # Cartesian-tree construction along the right spine: O(n) for runs already in order
+        stack = []
+        for code, length in zip(codes, lengths):
+            node = self.new_node(int(code), int(length))
+            last = NIL
+            while stack and self.priority[stack[-1]] < self.priority[node]:
+                last = stack.pop()
+            self.left[node] = last
+            if stack:
+                self.right[stack[-1]] = node
+            stack.append(node)
+        if not stack:
+            return
+        root = stack[0]
+        # Post-order pass to fill subtree totals and parent links
+        order, pending = [], [root]
+        while pending:
+            node = pending.pop()
+            order.append(node)
+            for child in (self.left[node], self.right[node]):
+                if child != NIL:
+                    pending.append(child)
+        for node in reversed(order):
+            self.update(node)
+        self.parent[root] = NIL
+        self.roots[strand] = root
+
+    # Queries
+
+    def strand_length(self, strand):
+        root = self.roots[strand]
+        return self.total[root] if root != NIL else 0
+
+    def position(self, node):
+        # Start of a run, walking up to the root
+        pos = self.total[self.left[node]] if self.left[node] != NIL else 0
+        while self.parent[node] != NIL:
+            parent = self.parent[node]
+            if self.right[parent] == node:
+                pos += self.length[parent]
+                if self.left[parent] != NIL:
+                    pos += self.total[self.left[parent]]
+            node = parent
+        return pos
+
+    def strand_of(self, node):
+        while self.parent[node] != NIL:
+            node = self.parent[node]
+        return self.roots.index(node)
+
+    def code_at(self, strand, pos):
+        node = self.roots[strand]
+        while node != NIL:
+            left_total = self.total[self.left[node]] if self.left[node] != NIL else 0
+            if pos < left_total:
+                node = self.left[node]
+            elif pos < left_total + self.length[node]:
+                return self.code[node]
+            else:
+                pos -= left_total + self.length[node]
+                node = self.right[node]
+        return 0
+
+    def nodes_of_type(self, element_type):
+        return [node for node, code in enumerate(self.code) if code == element_type and self.length[node] > 0]
+
+    def count_nonzero(self):
+        return sum(length for length, code in zip(self.length, self.code) if code != 0)
+
+    @property
+    def size(self):
+        return sum(self.strand_length(strand) for strand in range(self.num_strands))
+
+    # Edits
+
+    def insert(self, strand, pos, node):
+        a, b = self.split(self.roots[strand], pos)
+        self.roots[strand] = self.merge(self.merge(a, node), b)
+
+    def excise(self, node):
+        """ Cut a run out of its strand; downstream positions shift left by its length. """
+        strand = self.strand_of(node)
+        pos = self.position(node)
+        a, rest = self.split(self.roots[strand], pos)
+        _, b = self.split(rest, self.length[node])
+        self.roots[strand] = self.merge(a, b)
+        # Run boundaries line up with the cut, so the middle piece is this node alone
+        self.left[node] = self.right[node] = self.parent[node] = NIL
+        self.total[node] = self.length[node]
+        return node
+
+    def to_runs(self, strand):
+        codes, lengths = [], []
+        pending, node = [], self.roots[strand]
+        while pending or node != NIL:
+            while node != NIL:
+                pending.append(node)
+                node = self.left[node]
+            node = pending.pop()
+            codes.append(self.code[node])
+            lengths.append(self.length[node])
+            node = self.right[node]
+        return np.array(codes, dtype=np.uint8), np.array(lengths, dtype=np.int64)
+
+
+def rope_genome_from_intervals(genome, rng):
+    # Interval store -> runs with explicit empty gaps between elements
+    rope = RopeGenome(genome.num_strands, rng)
+    for strand in range(genome.num_strands):
+        starts, ends, types = genome.starts[strand], genome.ends[strand], genome.types[strand]
+        gaps = starts - np.concatenate(([0], ends[:-1]))
+        codes = np.zeros(2 * len(starts) + 1, dtype=np.uint8)
+        codes[1::2] = types
+        lengths = np.zeros(2 * len(starts) + 1, dtype=np.int64)
+        lengths[0:-1:2] = gaps
+        lengths[1::2] = ends - starts
+        lengths[-1] = genome.width - (ends[-1] if len(ends) else 0)
+        keep = lengths > 0
+        rope.build(strand, codes[keep], lengths[keep])
+    rope.stats = genome.stats.copy()
+    return rope
+
+
+# Elements cut and paste, as on the other engines: each is excised and spliced
+# in elsewhere, so the genome keeps its length instead of being overwritten in
+# place. With copy_and_paste=True, retrotransposons (type 2) instead leave the
+# original in place and splice in a new copy, and the genome grows.
+copy_and_paste_types = {2}
+
+
+def move_element_insertion(rope, element_type, interaction_log, round_num, rng, copy_and_paste=False):
+    nodes = rope.nodes_of_type(element_type)
+    count('elements_moved', len(nodes))
+    for node in nodes:
+        element_length = rope.length[node]
+        if copy_and_paste and element_type in copy_and_paste_types:
+            moving = rope.new_node(element_type, element_length)
+            rope.stats.elements[element_type] += 1
+        else:
+            rope.stats.remove_run(rope.strand_of(node), element_type, element_length)
+            moving = rope.excise(node)
+
+        new_strand = int(rng.integers(0, rope.num_strands))
+        new_start_pos = int(rng.integers(0, rope.strand_length(new_strand) + 1))
+
+        # After the splice the element sits between the bases now at new_start_pos - 1 and new_start_pos
+        with phase('interaction_check'):
+            for pos in (new_start_pos - 1, new_start_pos):
+                if 0 <= pos < rope.strand_length(new_strand):
+                    adjacent_element = rope.code_at(new_strand, pos)
+                    if adjacent_element != 0 and adjacent_element != element_type:
+                        interaction_type = (element_type, adjacent_element)
+                        interaction_log[round_num][interaction_type] += 1
+
+        rope.insert(new_strand, new_start_pos, moving)
+        rope.stats.insert_run(new_strand, element_type, element_length)
+
+    return rope
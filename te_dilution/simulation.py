@@ -0,0 +1,409 @@
+# Packages:
+import os
+import numpy as np
+import logging
+import csv
+import json
+import time
+from .free_space import build_free_space_index, largest_first, largest_first_order, free_gaps, place_elements
+from .interval_genome import (initialize_interval_genome, populate_interval_genome,
+                             move_element_intervals)
+from .grid_storage import allocate_grid, grow_grid, remove_grid_file
+from .genome_layout import generate_layout, write_layout_to_grid, write_layout_to_intervals
+from .element_table import ElementTable, element_table_from_layout
+from .batched_moves import move_elements_batched
+from .rope_genome import rope_genome_from_intervals, move_element_insertion
+from .random_streams import default_generator
+from .genome_composition import GenomeConfig, element_names
+from .replicate_runner import iter_replicates
+from .results_writer import ResultsWriter
+from .instrumentation import phase, count, start_recording, stop_recording
+from .genome_stats import GenomeStats, overwrite_cells, check_stats_density, num_codes
+from .coarsening import coarsen_element_lengths
+from .grid_view import run_length_view
+from .checkpoints import checkpoint_path, save_checkpoint, load_checkpoint, restore_genome, saved_run, same_lengths
+from . import kernels
+from .interaction_log import initialize_interaction_log, interaction_rows, interaction_columns
+
+
+def initialize_grid(grid_height, grid_width, dtype=int, memmap_path=None):
+    # dtype=np.uint8 stores the 0-4 codes in one byte; memmap_path backs the grid with a file on local disk
+    grid = allocate_grid(grid_height, grid_width, dtype, memmap_path)
+    return grid
+
+def resize_grid(grid, additional_length):
+    with phase('resize'):
+        new_grid = grow_grid(grid, additional_length)
+    return new_grid
+
+def check_and_record_interactions(grid, strand, start_pos, element_length, element_type, interaction_log, round_num):
+    end_pos = start_pos + element_length
+    adjacent_positions = [start_pos - 1, end_pos]  # positions next to start and end of the element
+
+    for pos in adjacent_positions:
+        if 0 <= pos < grid.shape[1]:  # Check within grid bounds
+            adjacent_element = grid[strand, pos]
+            if adjacent_element != 0 and adjacent_element != element_type:
+                interaction_type = (element_type, adjacent_element)
+                interaction_log[round_num][interaction_type] += 1
+
+# Fly Genome Statistics and Initial Calculations
+genome_size = 180000000
+mean_gene_length = 462
+min_gene_length = 2
+max_gene_length = 14544
+num_genes = 14000
+
+retrotransposons_stats = {'mean': 2869, 'min_len': 215, 'max_len': 7490, 'std_dev': 3213}
+dnatransposons_stats = {'mean': 2180, 'min_len': 52, 'max_len': 5453, 'std_dev': 2013}
+
+retrotransposons_proportion = 0.18
+dnatransposons_proportion = 0.02
+
+num_non_coding_segments = 5000
+
+genome_parameters = {
+    'genome_size': genome_size,
+    'mean_gene_length': mean_gene_length,
+    'min_gene_length': min_gene_length,
+    'max_gene_length': max_gene_length,
+    'num_genes': num_genes,
+    'retrotransposons_stats': retrotransposons_stats,
+    'dnatransposons_stats': dnatransposons_stats,
+    'retrotransposons_proportion': retrotransposons_proportion,
+    'dnatransposons_proportion': dnatransposons_proportion,
+    'num_non_coding_segments': num_non_coding_segments,
+}
+
+# Sampled on first access, not at import. Set genome_seed to pin the genome and reuse it from genome_cache_dir.
+genome_seed = None
+genome_cache_dir = '.genome_cache'
+genome_config = GenomeConfig(genome_parameters, genome_seed, genome_cache_dir)
+
+def __getattr__(name):
+    # exon_lengths, retrotransposons_lengths, ... and genomic_elements_lengths stay importable module attributes
+    if name in element_names.values():
+        return getattr(genome_config, name)
+    if name == 'genomic_elements_lengths':
+        return {element_names[code]: lengths for code, lengths in genome_config.element_lengths.items()}
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+num_rounds = 1  # Rounds of transposition per simulation
+
+def populate_grid(grid, genomic_elements_lengths, element_table=None, rng=None, stats=None):
+    # Uniform over every free (row, col) where the element fits, drawn from the free-gap index
+    rng = default_generator(rng)
+    if element_table is None:
+        element_table = ElementTable(sum(len(lengths) for lengths in genomic_elements_lengths.values()))
+    if kernels.active_backend() == 'numba':
+        return populate_grid_compiled(grid, genomic_elements_lengths, element_table, rng, stats)
+    free_space = build_free_space_index(grid)
+    for element_type, length in largest_first(genomic_elements_lengths):
+        position = free_space.place(length, rng)
+
+        if position is not None:
+            row, col = position
+            grid[row, col:col + length] = element_type
+            element_table.append(element_type, row, col, length)
+            if stats is not None:
+                stats.place(row, element_type, length)
+        else:
+            raise ValueError("No available position to place the element")
+    return element_table
+
+def populate_grid_compiled(grid, genomic_elements_lengths, element_table, rng, stats):
+    # The same placements as the loop above, drawn in one compiled pass, then written out at once
+    types, lengths = largest_first_order(genomic_elements_lengths)
+    strands, starts, placed = place_elements(free_gaps(grid), grid.shape[1], lengths, rng)
+    if placed < len(lengths):
+        raise ValueError("No available position to place the element")
+    kernels.write_elements(np.asarray(grid), strands, starts, lengths, types)
+    element_table.extend(types, strands, starts, lengths)
+    if stats is not None:
+        stats.add_layout((strands, starts, lengths, types))
+    return element_table
+
+def move_element_optimized(grid, element_type, interaction_log, round_num, element_table, rng=None, stats=None):
+    height, width = grid.shape
+    rng = default_generator(rng)
+
+    # One move per element in the table, not one per base
+    rows = element_table.rows_of_type(element_type)
+    count('elements_moved', len(rows))
+    if kernels.active_backend() == 'numba':
+        return move_elements_compiled(grid, element_type, interaction_log, round_num, element_table, rows, rng, stats)
+    for row in rows:
+        strand, start_pos = element_table.strands[row], element_table.starts[row]
+        element_length = element_table.lengths[row]
+        end_pos = start_pos + element_length
+
+        new_strand = int(rng.integers(0, height))
+        new_start_pos = int(rng.integers(0, width))
+
+        if new_start_pos + element_length > width:
+            grid = resize_grid(grid, new_start_pos + element_length - width)
+            if stats is not None:
+                stats.grow(grid.shape[1] - width)
+            width = grid.shape[1]
+
+        with phase('interaction_check'):
+            check_and_record_interactions(grid, new_strand, new_start_pos, element_length, element_type, interaction_log, round_num)
+
+        overwrite_cells(grid, stats, strand, start_pos, end_pos, 0)
+        overwrite_cells(grid, stats, new_strand, new_start_pos, new_start_pos + element_length, element_type)
+        element_table.strands[row] = new_strand
+        element_table.starts[row] = new_start_pos
+
+    return grid
+
+def move_elements_compiled(grid, element_type, interaction_log, round_num, element_table, rows, rng, stats):
+    # Same draws and cell writes as the loop above, as two compiled passes: draw every move
+    # (tracking the width), widen the grid once, then move the cells
+    height, width = grid.shape
+    new_strands, new_starts, new_width = kernels.draw_moves(rng, element_table.lengths[rows], height, width)
+    if new_width > width:
+        grid = resize_grid(grid, new_width - width)
+        if stats is not None:
+            stats.grow(new_width - width)
+    bp = stats.bp if stats is not None else np.zeros((height, 5), dtype=np.int64)
+    with phase('interaction_check'):
+        kernels.move_cells(np.asarray(grid), rows, element_table.strands, element_table.starts, element_table.lengths,
+                           new_strands, new_starts, element_type, interaction_log[round_num], bp)
+    return grid
+
+def reset_grid(grid, exon_lengths, retrotransposons_lengths, dnatransposons_lengths, non_coding_segment_lengths):
+    logging.info("Resetting grid for new round")
+    grid.fill(0)
+
+# Only transposons move; exons and non-coding segments stay put
+mobile_element_types = [2, 3]
+
+def run_simulation(grid, num_rounds, genomic_elements_lengths, engine='dense', layout='incremental', move_mode='sequential', rng=None,
+                   checkpoint=None, checkpoint_every=1, resume_state=None, seed=None, composition_log=None,
+                   root_entropy=None, genome_lengths=None, snapshot=None, copy_and_paste=False):
+    # checkpoint: file written after every checkpoint_every rounds (and the last one);
+    # resume_state: a loaded checkpoint to continue from instead of round 0
+    # root_entropy/genome_lengths: the run's root seed and (uncoarsened) element lengths, saved with each checkpoint
+    # snapshot: .npz path the populated genome of round 0 is saved to, run-length encoded, for the report's genome view
+    # composition_log: optional (num_rounds, 5) array, filled with the bp per code after each round
+    # copy_and_paste: rope engine only, retrotransposons copy themselves instead of cutting and pasting
+    interaction_log = initialize_interaction_log(num_rounds)
+    rng = default_generator(rng)
+    start_round = 0
+    if resume_state is not None:
+        grid = restore_genome(grid, resume_state)
+        interaction_log[:] = resume_state['interaction_log']
+        rng.bit_generator.state = resume_state['rng_state']
+        if composition_log is not None and 'composition_log' in resume_state:
+            composition_log[:] = resume_state['composition_log']
+        start_round = resume_state['next_round']
+        logging.info(f"Resuming at round {start_round} of {num_rounds}")
+
+    # The rope engine lays out each round in an interval store, then splices elements in and out of a rope.
+    # The interval store and the rope keep their own running stats; the dense grid's live here.
+    genome = grid
+    stats = GenomeStats(grid.shape[0], grid.shape[1])
+    for round_num in range(start_round, num_rounds):
+        with phase('layout'):
+            if engine in ('interval', 'rope'):
+                logging.info("Resetting grid for new round")
+                grid.reset()
+            else:
+                reset_grid(grid, *genomic_elements_lengths.values())
+                stats.reset(grid.shape[1])
+
+            # layout: 'incremental' places elements one by one, 'vectorized' lays out the whole genome at once
+            if layout == 'vectorized':
+                genome_layout = generate_layout(genomic_elements_lengths, *grid.shape, rng)
+                if engine in ('interval', 'rope'):
+                    write_layout_to_intervals(grid, genome_layout)
+                else:
+                    write_layout_to_grid(grid, genome_layout)
+                    stats.add_layout(genome_layout)
+                    element_table = element_table_from_layout(genome_layout)
+            elif engine in ('interval', 'rope'):
+                populate_interval_genome(grid, genomic_elements_lengths, rng)
+            else:
+                element_table = populate_grid(grid, genomic_elements_lengths, rng=rng, stats=stats)
+
+            if engine == 'rope':
+                genome = rope_genome_from_intervals(grid, rng)
+
+        if snapshot is not None and round_num == 0:
+            with phase('io'):
+                run_length_view(grid).save(snapshot)
+
+        element_types_to_move = list(mobile_element_types)
+        rng.shuffle(element_types_to_move)
+
+        with phase('move'):
+            for element_type in element_types_to_move:
+                if engine == 'interval':
+                    move_element_intervals(grid, element_type, interaction_log, round_num, rng)
+                elif engine == 'rope':
+                    # Insertions splice the element in and shift everything downstream
+                    move_element_insertion(genome, element_type, interaction_log, round_num, rng, copy_and_paste)
+                elif move_mode == 'batched':
+                    # Whole element type in one vectorized pass (see batched_moves for the ordering rule)
+                    grid = move_elements_batched(grid, element_type, interaction_log, round_num, element_table, rng, stats)
+                else:
+                    grid = move_element_optimized(grid, element_type, interaction_log, round_num, element_table, rng, stats)
+
+        # Read off the running stats of the grown genome: O(1), no pass over the cells
+        with phase('density'):
+            round_stats = genome.stats if engine in ('interval', 'rope') else stats
+            check_stats_density(round_stats)
+            if composition_log is not None:
+                composition_log[round_num] = round_stats.composition()
+
+        if checkpoint is not None and ((round_num + 1) % checkpoint_every == 0 or round_num + 1 == num_rounds):
+            with phase('io'):
+                save_checkpoint(checkpoint, round_num + 1, seed, grid, interaction_log, rng,
+                                root_entropy, genome_lengths, composition_log, engine)
+
+    return interaction_log
+
+# Columnar result layout: one row per (replicate, round, interaction pair)
+result_columns = [('simulation_number', np.int64), ('seed', np.uint64), ('round', np.int64),
+                  ('element_type', np.uint8), ('adjacent_type', np.uint8), ('count', np.int64)]
+
+
+def main(engine='dense', layout='incremental', dtype=int, memmap_dir=None, move_mode='sequential',
+         num_simulations=1, workers=1, root_seed=None, output_path='simulation_results.csv',
+         checkpoint_dir=None, checkpoint_every=1, resume=False, metrics_path=None,
+         config=None, rounds=None, coarsen=1, backend=None, snapshot_path=None, copy_and_paste=False):
+    # num_simulations replicates, fanned out over `workers` processes; root_seed pins every replicate's stream
+    # resume=True picks every replicate up from its latest checkpoint in checkpoint_dir
+    # metrics_path: write one JSON line of phase timings and counters per replicate
+    # config/rounds: a GenomeConfig and round count in place of genome_config and num_rounds
+    # backend: kernel backend for every replicate ('auto', 'numba' or 'numpy'; None keeps the current one)
+    # snapshot_path: save replicate 0's populated genome there (see run_simulation)
+    # copy_and_paste: retrotransposons copy and paste on the rope engine (see rope_genome.py)
+    # Returns the element lengths the replicates ran with (the checkpointed ones when resuming)
+    width = genome_size if config is None else config.parameters['genome_size']
+    config = genome_config if config is None else config
+    saved = saved_run(checkpoint_dir) if resume and checkpoint_dir is not None else None
+    if saved is not None:
+        # Carry on with the checkpointed run's seed and genome; given ones must match them
+        saved_root_seed, element_types = saved
+        if root_seed is not None and root_seed != saved_root_seed:
+            raise ValueError(f"Checkpoints in {checkpoint_dir} were written with root seed {saved_root_seed}, not {root_seed}")
+        if config.seed is not None and not same_lengths(config.element_lengths, element_types):
+            raise ValueError(f"Checkpoints in {checkpoint_dir} were written for a different genome than genome seed {config.seed} gives")
+        root_seed = saved_root_seed
+    else:
+        element_types = config.element_lengths
+    if root_seed is None:
+        # Draw the root entropy here, so checkpoints can record it
+        root_seed = np.random.SeedSequence().entropy
+    results = iter_replicates(single_simulation_run, num_simulations, workers, root_seed,
+                              engine=engine, layout=layout, dtype=dtype, memmap_dir=memmap_dir,
+                              move_mode=move_mode, element_types=element_types,
+                              width=width, rounds=rounds,
+                              checkpoint_dir=checkpoint_dir, checkpoint_every=checkpoint_every, resume=resume,
+                              instrument=metrics_path is not None, coarsen=coarsen, backend=backend,
+                              root_entropy=root_seed, snapshot_path=snapshot_path, copy_and_paste=copy_and_paste)
+    metrics_file = open(metrics_path, 'w') if metrics_path is not None else None
+
+    def write_metrics(simulation_number, seed, metrics, io_time):
+        # Result writing happens here in the parent, so its time is added to the replicate's record
+        if metrics_file is not None:
+            metrics['phases']['io'] = metrics['phases'].get('io', 0.0) + io_time
+            metrics_file.write(json.dumps({'simulation_number': simulation_number, 'seed': seed, **metrics}) + '\n')
+            metrics_file.flush()
+
+    # Each replicate is written out as soon as it finishes, so memory stays flat
+    # however many replicates run. A .csv path keeps the original CSV layout; any
+    # other path gets integer columns via ResultsWriter (Parquet or .npy shards).
+    if output_path.endswith('.csv'):
+        headers = ['simulation_number', 'seed', 'interaction', 'count']
+        with open(output_path, 'w', newline='') as csvfile:
+            csvwriter = csv.writer(csvfile)
+            csvwriter.writerow(headers)
+            for simulation_number, seed, interaction_log, metrics in results:
+                started = time.perf_counter()
+                for round_num, interaction_type, interaction_count in interaction_rows(interaction_log):
+                    csvwriter.writerow([simulation_number, seed, interaction_type, interaction_count])
+                write_metrics(simulation_number, seed, metrics, time.perf_counter() - started)
+    else:
+        with ResultsWriter(output_path, result_columns) as writer:
+            for simulation_number, seed, interaction_log, metrics in results:
+                started = time.perf_counter()
+                columns = interaction_columns(interaction_log)
+                columns['simulation_number'] = simulation_number
+                columns['seed'] = seed
+                writer.write(columns)
+                write_metrics(simulation_number, seed, metrics, time.perf_counter() - started)
+    if metrics_file is not None:
+        metrics_file.close()
+    return element_types
+
+def single_simulation_run(simulation_number, engine='dense', layout='incremental', dtype=int, memmap_dir=None, move_mode='sequential',
+                          seed=None, element_types=None, width=None, rounds=None,
+                          checkpoint_dir=None, checkpoint_every=1, resume=False, instrument=False, coarsen=1, backend=None,
+                          root_entropy=None, snapshot_path=None, copy_and_paste=False):
+    # engine: 'dense' for the 2 x genome_size int grid, 'interval' for the sorted-interval store,
+    # 'rope' for true insertions that shift downstream sequence
+    # copy_and_paste: on the rope engine, retrotransposons copy and paste, so the genome grows under TE bursts
+    # dtype/memmap_dir: storage of the dense grid, e.g. np.uint8 backed by memmap_dir/grid_<n>.dat
+    # seed: replicate seed (spawned by run_replicates); element_types: length arrays, passed to worker processes
+    # width/rounds: override genome_size and num_rounds, e.g. for one point of a parameter sweep
+    # checkpoint_dir/checkpoint_every/resume: save state every N rounds; resume continues from the
+    # latest checkpoint in checkpoint_dir and gives the same result as an uninterrupted run
+    # instrument: record phase timings and counters, returned as a dict after the interaction log (else None),
+    # with the bp per code after each round under 'composition'
+    # coarsen: run a 1/coarsen scale prototype, with genome width and element lengths divided by coarsen
+    # backend: kernel backend, selected in this (possibly worker) process; reported in the metrics
+    # root_entropy: root seed the replicate seeds were spawned from, recorded in the checkpoints
+    # snapshot_path: replicate 0 saves its populated genome there (the other replicates ignore it)
+    width = genome_size if width is None else width
+    rounds = num_rounds if rounds is None else rounds
+    checkpoint = None if checkpoint_dir is None else checkpoint_path(checkpoint_dir, simulation_number)
+    resume_state = load_checkpoint(checkpoint) if resume and checkpoint is not None else None
+    if resume_state is not None:
+        if 'engine' in resume_state and resume_state['engine'] != engine:
+            raise ValueError(f"Checkpoint {checkpoint} was written by the {resume_state['engine']} engine, not {engine}")
+        if seed is not None and seed != resume_state['seed']:
+            raise ValueError(f"Checkpoint {checkpoint} was written with seed {resume_state['seed']}, not {seed}")
+        if resume_state['interaction_log'].shape[0] != rounds:
+            raise ValueError(f"Checkpoint {checkpoint} is for a {resume_state['interaction_log'].shape[0]}-round run, not {rounds}")
+        seed = resume_state['seed']
+    if seed is None:
+        seed = np.random.randint(0, 2**31 - 1)
+    rng = np.random.default_rng(seed)
+    active_backend = kernels.active_backend() if backend is None else kernels.use_backend(backend)
+    logging.info(f"Running simulation {simulation_number} with seed: {seed} ({active_backend} kernels)")
+    if resume_state is not None and 'element_lengths' in resume_state:
+        if element_types is not None and not same_lengths(element_types, resume_state['element_lengths']):
+            raise ValueError(f"Checkpoint {checkpoint} was written for a different genome")
+        element_types = resume_state['element_lengths']
+    if element_types is None:
+        element_types = genome_config.element_lengths
+    genome_lengths = element_types
+    if coarsen > 1:
+        element_types = coarsen_element_lengths(element_types, coarsen)
+        width = -(-width // coarsen)
+    memmap_path = None
+    if engine in ('interval', 'rope'):
+        grid = initialize_interval_genome(2, width)
+    elif engine == 'dense':
+        memmap_path = None if memmap_dir is None else os.path.join(memmap_dir, f"grid_{simulation_number}.dat")
+        grid = initialize_grid(2, width, dtype, memmap_path)
+    else:
+        raise ValueError(f"Unknown genome engine: {engine}")
+    composition_log = np.zeros((rounds, num_codes), dtype=np.int64) if instrument else None
+    if instrument:
+        start_recording()
+    try:
+        interaction_log = run_simulation(grid, rounds, element_types, engine, layout, move_mode, rng,
+                                         checkpoint, checkpoint_every, resume_state, seed, composition_log,
+                                         root_entropy=root_entropy, genome_lengths=genome_lengths,
+                                         snapshot=snapshot_path if simulation_number == 0 else None,
+                                         copy_and_paste=copy_and_paste)
+    finally:
+        # The grid file is scratch space (checkpoints hold the genome), and at fly scale it is GBs per replicate
+        if memmap_path is not None:
+            del grid
+            remove_grid_file(memmap_path)
+    metrics = {'backend': active_backend, **stop_recording(), 'composition': composition_log.tolist()} if instrument else None
+    return simulation_number, seed, interaction_log, metrics
@@ -0,0 +1,104 @@
+# Packages:
+import csv
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from .genome_composition import fly_genome_parameters, scaled_genome_parameters, GenomeConfig
+from .simulation import single_simulation_run
+from .interaction_log import interaction_rows, interaction_columns
+from .results_writer import ResultsWriter
+
+
+# Parameter sweeps. A sweep is a list of parameter points (dicts overriding
+# fly_genome_parameters), or a grid {name: [values, ...]} expanded into every
+# combination. A point that sets genome_size starts from the fly parameters
+# scaled to that size, as the command line does, before its other overrides. Each point runs num_replicates replicates; all replicates of a
+# point share one sampled genome composition, as a single script run does.
+# Seeds come from a root SeedSequence spawned per point and then per
+# replicate, so results do not depend on job order or worker count.
+def expand_sweep(grid=None, points=None):
+    """ Return the full parameter dict of every sweep point. """
+    expanded = [dict(point) for point in points or []]
+    if grid:
+        names = list(grid)
+        for values in itertools.product(*(grid[name] for name in names)):
+            expanded.append(dict(zip(names, values)))
+    return [{**(scaled_genome_parameters(point['genome_size']) if 'genome_size' in point else fly_genome_parameters), **point}
+            for point in expanded]
+
+
+def estimated_cost(point):
+    # Placement and moves both scale with genome size and the number of rounds
+    return point['genome_size'] * max(point['num_rounds'], 1)
+
+
+def flatten_parameters(point):
+    # Nested stats dicts become dotted columns, e.g. retrotransposons_stats.mean
+    flat = {}
+    for name, value in point.items():
+        if isinstance(value, dict):
+            for key, inner in value.items():
+                flat[f"{name}.{key}"] = inner
+        else:
+            flat[name] = value
+    return flat
+
+
+def run_sweep_job(point_number, point, point_seed, replicate, replicate_seed, cache_dir, options):
+    element_types = GenomeConfig(point, point_seed, cache_dir).element_lengths
+    _, seed, interaction_log, _ = single_simulation_run(
+        replicate, seed=replicate_seed, element_types=element_types,
+        width=point['genome_size'], rounds=point['num_rounds'], **options)
+    return point_number, replicate, seed, interaction_log
+
+
+def completed_jobs(jobs, workers):
+    # Results in completion order, so each can be written out and dropped straight away
+    if workers == 1:
+        for job in jobs:
+            yield run_sweep_job(*job)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for future in as_completed([pool.submit(run_sweep_job, *job) for job in jobs]):
+            yield future.result()
+
+
+def run_sweep(points, num_replicates, output_path='sweep_results.csv', workers=1, root_seed=None, cache_dir=None, **options):
+    """ Run every point num_replicates times, cheapest points first, and write one tidy results table. """
+    # cache_dir: reuse each point's sampled genome across replicates and repeat sweeps
+    root = np.random.SeedSequence(root_seed)
+    logging.info(f"Running sweep of {len(points)} points x {num_replicates} replicates from root seed: {root.entropy}")
+    jobs = []
+    for point_number, (point, point_sequence) in enumerate(zip(points, root.spawn(len(points)))):
+        point_seed = int(point_sequence.generate_state(1, dtype=np.uint64)[0])
+        for replicate, child in enumerate(point_sequence.spawn(num_replicates)):
+            replicate_seed = int(child.generate_state(1, dtype=np.uint64)[0])
+            jobs.append((point_number, point, point_seed, replicate, replicate_seed, cache_dir, options))
+    jobs.sort(key=lambda job: estimated_cost(job[1]))
+
+    # Rows are streamed as jobs finish: a .csv path gets the tidy CSV, any other
+    # path integer columns via ResultsWriter (Parquet or .npy shards)
+    parameter_columns = list(flatten_parameters(points[0])) if points else []
+    flat_points = [flatten_parameters(point) for point in points]
+    if output_path.endswith('.csv'):
+        headers = ['point'] + parameter_columns + ['replicate', 'seed', 'round', 'element_type', 'adjacent_type', 'count']
+        with open(output_path, 'w', newline='') as csvfile:
+            csvwriter = csv.writer(csvfile)
+            csvwriter.writerow(headers)
+            for point_number, replicate, seed, interaction_log in completed_jobs(jobs, workers):
+                flat = [flat_points[point_number].get(name) for name in parameter_columns]
+                for round_num, (element_type, adjacent_type), count in interaction_rows(interaction_log):
+                    csvwriter.writerow([point_number] + flat + [replicate, seed, round_num, element_type, adjacent_type, count])
+        return output_path
+
+    columns = ([('point', np.int64)]
+               + [(name, np.result_type(*[flat.get(name) for flat in flat_points])) for name in parameter_columns]
+               + [('replicate', np.int64), ('seed', np.uint64), ('round', np.int64),
+                  ('element_type', np.uint8), ('adjacent_type', np.uint8), ('count', np.int64)])
+    with ResultsWriter(output_path, columns) as writer:
+        for point_number, replicate, seed, interaction_log in completed_jobs(jobs, workers):
+            chunk = interaction_columns(interaction_log)
+            chunk.update(flat_points[point_number], point=point_number, replicate=replicate, seed=seed)
+            writer.write(chunk)
+    return writer.output_path
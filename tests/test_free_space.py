@@ -0,0 +1,79 @@
+# Packages:
+import numpy as np
+from te_dilution import kernels
+from te_dilution.free_space import build_free_space_index, free_gaps, place_elements, largest_first_order
+
+
+# FreeSpaceIndex against a brute-force scan of the grid: the Fenwick prefix
+# sums must count exactly the (strand, start) pairs where an element fits, and
+# placements must land on them uniformly.
+def random_grid(rng, height=2, width=60, num_elements=8):
+    grid = np.zeros((height, width), dtype=np.int64)
+    for _ in range(num_elements):
+        strand, start = rng.integers(0, height), rng.integers(0, width)
+        grid[strand, start:start + rng.integers(1, 8)] = rng.integers(1, 5)
+    return grid
+
+
+def valid_starts(grid, length):
+    return {(strand, start) for strand in range(grid.shape[0]) for start in range(grid.shape[1] - length + 1)
+            if not grid[strand, start:start + length].any()}
+
+
+def test_available_positions_match_brute_force():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        grid = random_grid(rng)
+        index = build_free_space_index(grid)
+        for length in range(1, grid.shape[1] + 2):
+            assert index.available_positions(length) == len(valid_starts(grid, length))
+
+
+def test_place_reserves_free_stretches():
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        grid = random_grid(rng)
+        index = build_free_space_index(grid)
+        while True:
+            length = int(rng.integers(1, 10))
+            position = index.place(length, rng)
+            if position is None:
+                assert not valid_starts(grid, length)
+                break
+            strand, start = position
+            assert (strand, start) in valid_starts(grid, length)
+            grid[strand, start:start + length] = 1
+            for check_length in (1, 3, 7):
+                assert index.available_positions(check_length) == len(valid_starts(grid, check_length))
+
+
+def test_place_is_uniform_over_free_starts():
+    grid = random_grid(np.random.default_rng(2))
+    length, draws = 3, 20000
+    expected = valid_starts(grid, length)
+    rng = np.random.default_rng(3)
+    hits = {}
+    for _ in range(draws):
+        position = build_free_space_index(grid).place(length, rng)
+        hits[position] = hits.get(position, 0) + 1
+    assert set(hits) == expected
+    mean = draws / len(expected)
+    assert all(abs(count - mean) < 5 * np.sqrt(mean) for count in hits.values())
+
+
+def test_compiled_placement_follows_the_index():
+    # kernels.place_elements (here as plain Python) must pick the same gaps and offsets as FreeSpaceIndex.place
+    grid = random_grid(np.random.default_rng(4), width=400, num_elements=20)
+    lengths = {1: np.array([5, 9, 2, 14]), 2: np.array([30, 7]), 3: np.array([3, 3, 3]), 4: np.array([40, 11])}
+    types, ordered = largest_first_order(lengths)
+    index = build_free_space_index(grid)
+    rng = np.random.default_rng(5)
+    expected = [index.place(int(length), rng) for length in ordered]
+    previous = kernels.active_backend()
+    kernels.use_backend('numpy')
+    try:
+        strands, starts, placed = place_elements(free_gaps(grid), grid.shape[1], ordered, np.random.default_rng(5))
+    finally:
+        kernels.use_backend(previous)
+    assert placed == len(ordered)
+    assert list(zip(strands.tolist(), starts.tolist())) == expected
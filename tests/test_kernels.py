@@ -0,0 +1,64 @@
+# Packages:
+import numpy as np
+import pytest
+from te_dilution import kernels, simulation
+from te_dilution.free_space import zero_runs
+from te_dilution.genome_composition import GenomeConfig, scaled_genome_parameters
+
+pytest.importorskip('numba')
+
+
+# The compiled kernels against the NumPy path: for a given seed every backend
+# must lay out the same genome and log the same interactions.
+@pytest.fixture
+def restore_backend():
+    previous = kernels.active_backend()
+    yield
+    kernels.use_backend(previous)
+
+
+def on_each_backend(run):
+    results = []
+    for backend in ('numpy', 'numba'):
+        kernels.use_backend(backend)
+        results.append(run())
+    return results
+
+
+def test_zero_runs(restore_backend):
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        row = rng.integers(0, 3, int(rng.integers(1, 50))) * rng.integers(0, 2, 1)
+        numpy_runs, numba_runs = on_each_backend(lambda: zero_runs(row))
+        for numpy_column, numba_column in zip(numpy_runs, numba_runs):
+            assert np.array_equal(numpy_column, numba_column)
+
+
+def test_populate_grid(restore_backend):
+    lengths = GenomeConfig(scaled_genome_parameters(50000), seed=1).element_lengths
+
+    def populate():
+        grid = simulation.initialize_grid(2, 50000, np.uint8)
+        table = simulation.populate_grid(grid, lengths, rng=np.random.default_rng(2))
+        return grid, table.strands[:table.count].copy(), table.starts[:table.count].copy()
+
+    (numpy_grid, *numpy_table), (numba_grid, *numba_table) = on_each_backend(populate)
+    assert np.array_equal(numpy_grid, numba_grid)
+    for numpy_column, numba_column in zip(numpy_table, numba_table):
+        assert np.array_equal(numpy_column, numba_column)
+
+
+@pytest.mark.parametrize('engine, layout, move_mode', [
+    ('dense', 'incremental', 'sequential'),
+    ('dense', 'vectorized', 'sequential'),
+    ('dense', 'incremental', 'batched'),
+    ('interval', 'incremental', 'sequential'),
+    ('rope', 'incremental', 'sequential'),
+])
+def test_simulation_runs(restore_backend, engine, layout, move_mode):
+    lengths = GenomeConfig(scaled_genome_parameters(50000), seed=3).element_lengths
+    for seed in range(3):
+        numpy_log, numba_log = on_each_backend(lambda: simulation.single_simulation_run(
+            0, engine=engine, layout=layout, move_mode=move_mode, dtype=np.uint8, seed=seed,
+            element_types=lengths, width=50000, rounds=2)[2])
+        assert np.array_equal(numpy_log, numba_log)
@@ -0,0 +1,45 @@
+# Packages:
+import numpy as np
+from te_dilution.rope_genome import RopeGenome
+
+
+# RopeGenome against a base-by-base list reference: every excise and insert is
+# mirrored on plain Python lists of codes, and the strands must read back the same.
+def expanded(rope, strand):
+    codes, lengths = rope.to_runs(strand)
+    return np.repeat(codes, lengths).tolist()
+
+
+def test_edits_match_base_by_base_reference():
+    rng = np.random.default_rng(0)
+    for trial in range(10):
+        rope = RopeGenome(2, np.random.default_rng(trial))
+        reference = []
+        for strand in range(2):
+            codes = rng.integers(0, 5, 30)
+            lengths = rng.integers(1, 12, 30)
+            rope.build(strand, codes, lengths)
+            reference.append(np.repeat(codes, lengths).tolist())
+
+        for _ in range(200):
+            nodes = [node for node in range(len(rope.code)) if rope.code[node] != 0 and rope.length[node] > 0]
+            node = nodes[rng.integers(0, len(nodes))]
+            strand, pos, length, code = rope.strand_of(node), rope.position(node), rope.length[node], rope.code[node]
+            assert reference[strand][pos:pos + length] == [code] * length
+            if rng.random() < 0.5:
+                # Cut and paste
+                moving = rope.excise(node)
+                del reference[strand][pos:pos + length]
+            else:
+                # Copy and paste
+                moving = rope.new_node(code, length)
+            new_strand = int(rng.integers(0, 2))
+            new_pos = int(rng.integers(0, len(reference[new_strand]) + 1))
+            rope.insert(new_strand, new_pos, moving)
+            reference[new_strand][new_pos:new_pos] = [code] * length
+
+            for check_strand in range(2):
+                assert rope.strand_length(check_strand) == len(reference[check_strand])
+                assert expanded(rope, check_strand) == reference[check_strand]
+            for probe in rng.integers(0, len(reference[0]), 5).tolist():
+                assert rope.code_at(0, probe) == reference[0][probe]